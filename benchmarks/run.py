@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+"""
+Benchmarks of the three games: how fast the rules run and how long a frame takes to draw.
+
+Windows are opened with SDL's dummy video driver, so it runs without a screen. Pong draws with turtle, which needs a
+display: its drawing benchmarks are skipped when there is none, or with --no-turtle.
+
+Every result has its unit at the end of its name: *_per_s are rates (higher is better), *_us and *_ms are times
+(lower is better). To catch regressions, save the results of a known good version and compare against them:
+
+    python benchmarks/run.py -o baseline.json
+    python benchmarks/run.py --baseline baseline.json    # Exits with 1 if something got slower.
+"""
+import json
+import os
+import platform
+import random
+import sys
+import time
+import unittest.mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GAMES = ('connect_four', 'snake', 'pong')
+for game in GAMES:
+    sys.path.insert(0, os.path.join(ROOT, game))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+
+def best(run, repeat=5):
+    """
+    Runs a benchmark a few times and keeps the fastest, which is the one the rest of the machine disturbed the least.
+    :param run: Function that returns a tuple with the seconds it took and the number of operations it did.
+    :returns: Seconds per operation.
+    """
+    return min(seconds / count for seconds, count in (run() for _ in range(repeat)))
+
+
+def timed(function, seconds=0.1):
+    """
+    Calls a function over and over for about a number of seconds.
+    :returns: Tuple with the seconds it took and the number of calls, to pass to best.
+    """
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        function()
+        count += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return now - start, count
+
+
+def quiet():
+    """
+    Turns print off (Board.drop prints the board). Redirecting the output isn't enough: formatting the board would
+    still be timed.
+    """
+    return unittest.mock.patch('builtins.print')
+
+
+def connect_four():
+    import pygame
+    from bitboard import BitBoard
+    from connect_four import Board, FastBoard
+
+    results = {}
+    for name, cls in (('numpy', Board), ('bitboard', FastBoard)):
+        board = cls(7, 6)
+        rng = random.Random(0)
+        moves = 0  # Counted to find out when the board is full, without looking at the cells.
+
+        def move():
+            """ Drops a token in a random column, starting over when the game ends. """
+            nonlocal moves
+            pos = board.drop((rng.randrange(board.width) * board.cell_size, 0))
+            moves += pos is not None
+            if pos is None or board.finished(*pos) or moves == board.width * board.height:
+                board.reset()
+                board.turn = 1
+                moves = 0
+
+        with quiet():
+            results[f'connect_four.{name}.drop_finished_per_s'] = 1 / best(lambda: timed(move))
+            board.reset()
+            for column in (3, 3, 4, 2, 5, 3):
+                board.drop((column * board.cell_size, 0))
+        results[f'connect_four.{name}.draw_full_ms'] = 1e3 * best(
+            lambda: timed(lambda: pygame.display.update(board.draw())))
+
+        def changes():
+            """ A frame after a move: one token and the turn indicator. """
+            board.drawn_cells[0, 0] = 2
+            board.turn_indicator = (board.turn_indicator[0] + 1, board.turn_indicator[1])
+            pygame.display.update(board.draw_changes())
+        results[f'connect_four.{name}.draw_changes_us'] = 1e6 * best(lambda: timed(changes))
+
+    bits = BitBoard(7, 6)
+    rng = random.Random(0)
+    moves = 0
+
+    def play():
+        """ Same as move, on the bitboard alone, the way the searches and the tournaments play. """
+        nonlocal moves
+        column = rng.randrange(bits.width)
+        if bits.can_play(column):
+            bits.play(column)
+            moves += 1
+            if not bits.won() and moves < bits.width * bits.height:
+                return
+        bits.reset()
+        moves = 0
+    results['connect_four.bitboard.play_won_per_s'] = 1 / best(lambda: timed(play))
+    return results
+
+
+def snake():
+    import pygame
+    from core import SnakeState, RIGHT, DOWN
+    from snake import Grid, Snake, Cube
+
+    def around(state):
+        """
+        Direction to take to follow a cycle through every cell of the grid: right along a row until the cell before the
+        one it came in through, then down to the next row. The snake never bites itself on it.
+        """
+        x, y = state.head
+        return DOWN if x == (-y - 1) % state.rows else RIGHT
+
+    def long_snake(rows, length):
+        """ Snake state with a snake of some length, on the cycle of around. There is no snack. """
+        state = SnakeState(rows, seed=0, start=(0, 0))
+        while len(state.body) < length:
+            # Put the snack right in front of the head.
+            dx, dy = around(state)
+            state.snack = ((state.head[0] + dx) % rows, (state.head[1] + dy) % rows)
+            state.step((dx, dy))
+        state.snack = None
+        return state
+
+    results = {}
+    rows = 128
+    for length in (1, 10, 100, 1000, 10000):
+        state = long_snake(rows, length)
+        results[f'snake.step.length_{length}_per_s'] = 1 / best(lambda: timed(lambda: state.step(around(state))))
+
+    for fill in (0, 50, 90, 99):
+        for sparse in (False, True):
+            if sparse and fill > 90:
+                continue  # Guessing gets slow on crowded grids; that's what the free-cell index is for.
+            state = SnakeState(rows, seed=0, sparse=sparse)
+            rng = random.Random(0)
+            for pos in rng.sample([(x, y) for x in range(rows) for y in range(rows) if (x, y) != state.start],
+                                  rows * rows * fill // 100):
+                state.occupied.add(pos)
+                state.take(pos)
+            name = 'sparse' if sparse else 'dense'
+            results[f'snake.random_cell.{name}.fill_{fill}_us'] = 1e6 * best(lambda: timed(state.random_cell))
+
+    grid = Grid(500, 25)
+    state = long_snake(25, 200)
+    state.snack = state.random_cell()
+    drawer = Snake(grid, (0, 255, 0), state)
+
+    def full():
+        grid.draw()
+        drawer.draw()
+        Cube(grid, state.snack).draw()
+        pygame.display.update()
+    results['snake.draw_full_ms'] = 1e3 * best(lambda: timed(full))
+
+    state.vacated = state.random_cell()
+
+    def changes():
+        """ A frame after a step: the old and new head and the cell the tail left. """
+        pygame.display.update(drawer.draw_changes())
+    results['snake.draw_changes_us'] = 1e6 * best(lambda: timed(changes))
+    return results
+
+
+def pong(turtle=True):
+    from physics import PongState
+
+    results = {}
+    state = PongState(points=10 ** 9)
+    rng = random.Random(0)
+
+    def step():
+        state.paddles[0] = state.paddles[1] = max(-250, min(250, state.y + rng.uniform(-60, 60)))
+        state.step()
+    results['pong.step_per_s'] = 1 / best(lambda: timed(step))
+    try:
+        from vector_pong import VectorPong
+        import numpy
+    except ImportError:
+        pass
+    else:
+        matches = 4096
+        batch = VectorPong(matches, seed=0)
+        moves = numpy.random.default_rng(0).uniform(-10, 10, (matches, 2))
+        results['pong.vector.step_per_s'] = matches / best(lambda: timed(lambda: batch.step(moves)))
+    if turtle:
+        results.update(pong_drawing(state))
+    return results
+
+
+def pong_drawing(state):
+    """ How long a frame takes to draw, or nothing if there is no display for turtle. """
+    import tkinter
+    import turtle
+    try:
+        window = turtle.Screen()
+    except tkinter.TclError:
+        print('No display: skipping the pong drawing benchmarks.', file=sys.stderr)
+        return {}
+    from pong import Paddle, Ball, Score
+    window.setup(width=800, height=600)
+    window.tracer(0)
+    paddles = [Paddle(state, 1, -350), Paddle(state, 2, 350)]
+    ball = Ball(state)
+    Score(state).update()
+
+    def frame():
+        state.step()
+        ball.draw(0.5)
+        for paddle in paddles:
+            paddle.draw()
+        window.update()
+    results = {'pong.draw_frame_ms': 1e3 * best(lambda: timed(frame))}
+    window.bye()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the results next to the baseline.
+    :param tolerance: Fraction a result can get worse than in the baseline.
+    :returns: Names of the results that got worse than that.
+    """
+    regressions = []
+    width = max(map(len, results))
+    for name, value in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f'{name:{width}} {value:14.4g}')
+            continue
+        # Positive change is always better.
+        change = value / before - 1 if name.endswith('_per_s') else before / value - 1
+        flag = ''
+        if change < -tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:{width}} {value:14.4g} {before:14.4g} {change:+8.1%}{flag}')
+    return regressions
+
+
+def main(games=GAMES, output=None, baseline=None, tolerance=0.25, turtle=True):
+    """
+    Runs the benchmarks.
+    :param games: Names of the games to benchmark.
+    :param output: Path of a JSON file to save the results to.
+    :param baseline: Path of a JSON file with results to compare to.
+    :param tolerance: Fraction a result can get worse than in the baseline before it counts as a regression.
+    :param turtle: Run the benchmarks that need turtle (and a display).
+    :returns: Exit code: 1 if there are regressions.
+    """
+    benchmarks = {'connect_four': connect_four, 'snake': snake, 'pong': lambda: pong(turtle)}
+    results = {}
+    for game in games:
+        results.update(benchmarks[game]())
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, f,
+                      indent=2)
+    previous = {}
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f)['results']
+    regressions = compare(results, previous, tolerance)
+    if regressions:
+        print(f'{len(regressions)} regressions over {tolerance:.0%}: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Measures the speed of the games, and compares it to a baseline.")
+    parser.add_argument('games', nargs='*', help=f"Games to benchmark: {', '.join(GAMES)}. All of them by default.")
+    parser.add_argument('-o', '--output', help="Save the results to this JSON file.")
+    parser.add_argument('-b', '--baseline', help="Compare to the results in this JSON file.")
+    parser.add_argument('-t', '--tolerance', type=float, default=0.25,
+                        help="How much slower than the baseline a result can get, as a fraction.")
+    parser.add_argument('--no-turtle', action='store_true', help="Skip the benchmarks that need turtle.")
+    args = parser.parse_args()
+    for game in args.games:
+        if game not in GAMES:
+            parser.error(f'Unknown game: {game}')
+    sys.exit(main(args.games or GAMES, args.output, args.baseline, args.tolerance, not args.no_turtle))
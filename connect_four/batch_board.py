@@ -0,0 +1,184 @@
+"""
+Many Connect Four boards stepped at once with numpy.
+
+The boards use the same encoding as connect_four.Board.cells (0 for free cells, 1 and -1 for the players' tokens,
+row 0 on top), stacked in a 3-D array of shape (boards, height, width). Dropping one token on every board and
+checking the wins are a handful of array operations, no matter how many boards there are.
+It doesn't need pygame, so it runs headless.
+"""
+import numpy
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class BatchBoard:
+    """
+    A stack of boards. Every board has its own turn and finishes on its own; finished boards ignore the moves until
+    they are reset.
+    """
+    def __init__(self, boards, width=7, height=6):
+        """
+        :param boards: Number of boards.
+        :param width: Number of columns.
+        :param height: Number of rows.
+        """
+        assert height < 128, 'The column heights do not fit in an int8.'
+        self.boards = boards
+        self.width = width
+        self.height = height
+        # The boards are surrounded by a 3-cell margin, so the 7-cell lines through any cell never go out of bounds.
+        self.padded = numpy.zeros((boards, height + 6, width + 6), dtype=numpy.int8)
+        self.cells = self.padded[:, 3:-3, 3:-3]
+        self.heights = numpy.zeros((boards, width), dtype=numpy.int8)
+        self.turn = numpy.ones(boards, dtype=numpy.int8)
+        self.winner = numpy.zeros(boards, dtype=numpy.int8)
+        self.done = numpy.zeros(boards, dtype=bool)
+        self.index = numpy.arange(boards)
+        # Flat indexes into the padded array: where each board starts, and the offsets of the horizontal, vertical and
+        # diagonal 7-cell lines through a cell (4 directions x 7 cells).
+        padded_width = width + 6
+        self.flat = self.padded.reshape(-1)
+        self.starts = self.index * (height + 6) * padded_width + 3 * padded_width + 3
+        steps = numpy.arange(-3, 4)
+        self.lines = numpy.outer([padded_width * dr + dc for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1))], steps).ravel()
+
+    def __repr__(self):
+        return str(self.cells)
+
+    @classmethod
+    def from_cells(cls, boards, turns=None):
+        """
+        Stacks matrices like connect_four.Board.cells.
+        :param boards: Sequence of (height, width) matrices.
+        :param turns: Optional sequence with the player to move on each board. Defaults to 1.
+        :returns: A new BatchBoard.
+        """
+        cells = numpy.asarray(boards, dtype=numpy.int8)
+        batch = cls(len(cells), cells.shape[2], cells.shape[1])
+        batch.cells[:] = cells
+        batch.heights[:] = numpy.count_nonzero(cells, axis=1)
+        if turns is not None:
+            batch.turn[:] = turns
+        batch.winner[:] = batch.winners()
+        batch.done[:] = (batch.winner != 0) | (batch.heights.sum(axis=1) == batch.width * batch.height)
+        return batch
+
+    def legal(self):
+        """ Boolean array of shape (boards, width) with the columns that have room on boards still being played. """
+        return (self.heights < self.height) & ~self.done[:, None]
+
+    def random_columns(self, rng):
+        """
+        Picks a random playable column on every board.
+        :param rng: numpy.random.Generator.
+        :returns: Array of columns. Finished boards get column 0, which they ignore.
+        """
+        return numpy.argmax(rng.random((self.boards, self.width), dtype=numpy.float32) * self.legal(), axis=1)
+
+    def drop(self, columns):
+        """
+        Drops a token of the player to move on every board, one column per board.
+        :param columns: Integer array with one column per board.
+        :returns: Array with the row where each token lands, or -1 where the board is finished or the column is full.
+        """
+        heights = self.heights[self.index, columns]
+        moved = (heights < self.height) & ~self.done
+        rows = numpy.where(moved, self.height - 1 - heights.astype(numpy.intp), -1)
+        boards = self.index[moved]
+        columns = columns[moved]
+        self.cells[boards, rows[moved], columns] = self.turn[moved]
+        self.heights[boards, columns] += 1
+        self.turn[moved] *= -1
+        return rows
+
+    def finished(self, rows, columns):
+        """
+        Checks if the given slots are part of a four-in-a-row, one slot per board.
+        Only the four 7-cell lines through each slot are looked at.
+        :param rows: Integer array with one row per board. Boards with negative rows are skipped.
+        :param columns: Integer array with one column per board.
+        :returns: Boolean array with one value per board.
+        """
+        checked = rows >= 0
+        # In intp: with the int8 rows of a big board, the product would overflow.
+        cells = self.starts + rows.astype(numpy.intp) * (self.width + 6) + columns
+        lines = self.flat.take(cells[:, None] + self.lines).reshape(self.boards, 4, 7)
+        value = self.flat.take(cells)
+        same = lines == value[:, None, None]
+        pairs = same[:, :, :-1] & same[:, :, 1:]
+        fours = pairs[:, :, :-2] & pairs[:, :, 2:]
+        return fours.any(axis=(1, 2)) & (value != 0) & checked
+
+    def step(self, columns):
+        """
+        Drops one token per board and updates the winners and the finished boards.
+        :param columns: Integer array with one column per board.
+        :returns: Array with the row where each token lands, or -1 where nothing happened.
+        """
+        rows = self.drop(columns)
+        won = self.finished(rows, columns)
+        self.winner[won] = -self.turn[won]  # The turn has already changed.
+        self.done |= won | (self.heights.sum(axis=1) == self.width * self.height)
+        return rows
+
+    def winners(self):
+        """
+        Full check of every board with sliding 4-cell windows, for boards that were not built move by move.
+        :returns: Array with the winner of each board (1, -1), or 0 if nobody has four in a row.
+        """
+        cells = self.cells.astype(numpy.int16)
+        sums = [
+            sliding_window_view(cells, 4, axis=2).sum(axis=-1),
+            sliding_window_view(cells, 4, axis=1).sum(axis=-1),
+        ]
+        blocks = sliding_window_view(cells, (4, 4), axis=(1, 2))
+        sums.append(numpy.trace(blocks, axis1=-2, axis2=-1))
+        sums.append(numpy.trace(blocks[..., ::-1], axis1=-2, axis2=-1))
+        winner = numpy.zeros(self.boards, dtype=numpy.int8)
+        for s in sums:
+            s = s.reshape(self.boards, -1)
+            winner[(s == -4).any(axis=1)] = -1
+            winner[(s == 4).any(axis=1)] = 1
+        return winner
+
+    def board(self, k):
+        """ Matrix of one board, as used by connect_four.Board. """
+        return self.cells[k].astype(float)
+
+    def reset(self, boards=None):
+        """
+        Empties boards.
+        :param boards: Boolean mask or indexes of the boards to reset. All of them by default.
+        """
+        if boards is None:
+            boards = slice(None)
+        self.cells[boards] = 0
+        self.heights[boards] = 0
+        self.turn[boards] = 1
+        self.winner[boards] = 0
+        self.done[boards] = False
+
+
+def benchmark(boards=4096, steps=200, seed=0):
+    """
+    Plays random games on all the boards, resetting the finished ones, and prints the moves per second.
+    """
+    import time
+    rng = numpy.random.default_rng(seed)
+    batch = BatchBoard(boards)
+    moves = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        rows = batch.step(batch.random_columns(rng))
+        moves += numpy.count_nonzero(rows >= 0)
+        batch.reset(batch.done)
+    elapsed = time.perf_counter() - start
+    print(f'{boards} boards: {moves / elapsed:.0f} moves/s')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Measures the moves per second of the batch simulator.")
+    parser.add_argument('-k', '--boards', type=int, default=4096, help="Number of boards.")
+    parser.add_argument('-s', '--steps', type=int, default=200, help="Number of steps.")
+    args = parser.parse_args()
+    benchmark(args.boards, args.steps)
@@ -0,0 +1,203 @@
+"""
+Integer bitboard representation of a Connect Four board.
+
+Every column takes height + 1 bits of an integer, the extra bit on top works as a separator so that lines never
+wrap around from one column to the next one. For the default 7x6 board it looks like this (bit indexes):
+
+  6 13 20 27 34 41 48
+  5 12 19 26 33 40 47
+  4 11 18 25 32 39 46
+  3 10 17 24 31 38 45
+  2  9 16 23 30 37 44
+  1  8 15 22 29 36 43
+  0  7 14 21 28 35 42
+
+Each player owns one mask with the bits of their tokens, and the next free bit of a column is given by its height.
+Dropping a token is then a single OR and checking for four in a row takes a few shifts and ANDs.
+It doesn't need pygame, so it can be used for searches and simulations without opening a window.
+"""
+import numpy
+
+
+class BitBoard:
+    """
+    Drop-in replacement for the game state of connect_four.Board.
+    Player values follow the same convention: 1 is the first player and -1 is the second one.
+    """
+    cell_size = 80
+
+    def __init__(self, width=7, height=6):
+        """
+        Initializes the masks and the column heights.
+        :param width: Number of columns.
+        :param height: Number of rows.
+        """
+        assert width * (height + 1) <= 64, 'The board does not fit in a 64-bit integer.'
+        self.width = width
+        self.height = height
+        self.stride = height + 1  # Bits per column, including the separator.
+        self.shifts = (1, self.stride - 1, self.stride, self.stride + 1)  # Vertical and the three other directions.
+        self.reset()
+
+    def __repr__(self):
+        return str(self.cells)
+
+    @classmethod
+    def from_cells(cls, cells, turn=1):
+        """
+        Builds a bitboard out of a matrix like the one in connect_four.Board.
+        :param cells: Matrix with 0 for free cells, 1 and -1 for the players' tokens. Row 0 is the top one.
+        :param turn: Player to move.
+        :returns: A new BitBoard.
+        """
+        height, width = cells.shape
+        board = cls(width, height)
+        for column in range(width):
+            for row in range(height - 1, -1, -1):
+                value = cells[row, column]
+                if value == 0:
+                    break
+                board.tokens[board.index(int(value))] |= 1 << board.bit(row, column)
+                board.heights[column] += 1
+        board.turn = turn
+        return board
+
+    def copy(self):
+        board = BitBoard(self.width, self.height)
+        board.tokens = self.tokens[:]
+        board.heights = self.heights[:]
+        board.history = self.history[:]
+        board.turn = self.turn
+        board.game_over = self.game_over
+        return board
+
+    @staticmethod
+    def index(player):
+        """ Maps a player value (1 or -1) to its position in the list of masks. """
+        return (1 - player) // 2
+
+    @property
+    def mask(self):
+        """ All the occupied cells. """
+        return self.tokens[0] | self.tokens[1]
+
+    @property
+    def moves(self):
+        """ Number of tokens on the board. """
+        return sum(self.heights)
+
+    @property
+    def cells(self):
+        """ Matrix representation of the board, as used by connect_four.Board. """
+        def unpack(tokens):
+            """ Bits of a mask, as a matrix with a column for every column of the board and the bottom row first. """
+            bits = numpy.unpackbits(numpy.frombuffer(tokens.to_bytes(8, 'little'), numpy.uint8), bitorder='little')
+            return bits[:self.width * self.stride].reshape(self.width, self.stride)[:, :self.height]
+
+        # Turned, so that the rows are first and the top one comes first.
+        return numpy.rot90(unpack(self.tokens[0]).astype(float) - unpack(self.tokens[1]))
+
+    def key(self):
+        """
+        Unique integer for the position. In every column, the mask of the occupied cells plus the first player's tokens
+        gives a different number for every height and every arrangement of tokens, and it fits in the column's bits.
+        """
+        return self.tokens[0] + self.mask
+
+    def bit(self, row, column):
+        """
+        Index of the bit of a cell. Rows are counted from the top, the same way numpy does.
+        """
+        return column * self.stride + self.height - 1 - row
+
+    def can_play(self, column):
+        return self.heights[column] < self.height
+
+    def play(self, column):
+        """
+        Drops a token of the current player in a column that is known to have room for it.
+        :param column: Integer value of the column.
+        :returns: Row where the token lands.
+        """
+        height = self.heights[column]
+        self.tokens[(1 - self.turn) // 2] |= 1 << (column * self.stride + height)
+        self.heights[column] = height + 1
+        self.history.append(column)
+        self.turn = -self.turn
+        return self.height - 1 - height
+
+    def undo(self):
+        """ Takes back the last token. """
+        column = self.history.pop()
+        self.turn = -self.turn
+        self.heights[column] -= 1
+        self.tokens[(1 - self.turn) // 2] ^= 1 << (column * self.stride + self.heights[column])
+
+    def connected(self, tokens):
+        """
+        Checks if a mask contains four in a row.
+        Shifting a mask by one position in a direction and ANDing it with itself leaves the pairs; doing the same with
+        the pairs shifted by two positions leaves the fours.
+        :param tokens: Mask with the tokens of a player.
+        :return: True if four in a row are found. False otherwise
+        """
+        # The four directions at once: with so few of them, a loop and its early exit cost more than they save.
+        vertical, down, across, up = self.shifts
+        pairs1 = tokens & (tokens >> vertical)
+        pairs2 = tokens & (tokens >> down)
+        pairs3 = tokens & (tokens >> across)
+        pairs4 = tokens & (tokens >> up)
+        return bool(pairs1 & (pairs1 >> 2 * vertical) | pairs2 & (pairs2 >> 2 * down) |
+                    pairs3 & (pairs3 >> 2 * across) | pairs4 & (pairs4 >> 2 * up))
+
+    def won(self):
+        """
+        Checks if the player who just moved has four in a row. Same as finished on the last token, without finding
+        out whose it is: this is the check of the searches and the simulations, right after play.
+        """
+        return self.connected(self.tokens[(1 + self.turn) // 2])
+
+    def is_winning_move(self, column):
+        """ Checks if dropping a token of the current player in a (playable) column connects four. """
+        bit = 1 << (column * self.stride + self.heights[column])
+        return self.connected(self.tokens[(1 - self.turn) // 2] | bit)
+
+    def drop(self, pos):
+        """
+        Same as connect_four.Board.drop.
+        :param pos: Tuple with screen coordinates.
+        :returns: Tuple with the position where the token "drops". if there is no place in the column, returns None.
+        """
+        column = pos[0] // self.cell_size
+        height = self.heights[column]
+        if height >= self.height:
+            return None
+        # Same as play, inlined: this is the hot path of the games and the simulations.
+        self.tokens[(1 - self.turn) // 2] |= 1 << (column * self.stride + height)
+        self.heights[column] = height + 1
+        self.history.append(column)
+        self.turn = -self.turn
+        return self.height - 1 - height, column
+
+    def finished(self, row, column):
+        """
+        Checks if a slot is part of a four-in-a-row. Only the mask of the slot's owner needs to be checked, and after a
+        drop that is the player who just moved, so it is tried first.
+        :param row: Integer value of the row.
+        :param column: Integer value of the column.
+        :return: True if four in a row are found. False otherwise
+        """
+        bit = column * self.stride + self.height - 1 - row
+        tokens = self.tokens[(1 + self.turn) // 2]
+        if not tokens >> bit & 1:
+            tokens = self.tokens[(1 - self.turn) // 2]
+            if not tokens >> bit & 1:
+                return False
+        return self.connected(tokens)
+
+    def reset(self):
+        self.tokens = [0, 0]
+        self.heights = [0] * self.width
+        self.history = []
+        self.turn = 1
+        self.game_over = False
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Opening book for the COM players.
+
+The book is a binary file with a small header followed by fixed-size (key, score) records sorted by key. Keys are
+the unique position keys of BitBoard.key, taking the smaller one of a position and its mirror image, so that
+symmetric positions share a record. Scores are the negamax scores for the player to move.
+
+The file is looked up through mmap with a binary search, so opening a book doesn't read it into memory, and several
+processes using the same book share the operating system's page cache.
+
+Building a book searches every position up to a number of moves:
+
+    python book.py book.bin -d 6 -t 0.5
+"""
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard
+
+HEADER = struct.Struct('<4sBBBBI')  # Magic, version, width, height, depth, number of records.
+RECORD = struct.Struct('<Qh')  # Position key, score.
+MAGIC = b'C4OB'
+VERSION = 1
+
+
+def mirror(board, key):
+    """ Key of the mirror image of a position: the columns' bits in reverse order. """
+    column_mask = (1 << board.stride) - 1
+    mirrored = 0
+    for column in range(board.width):
+        mirrored |= (key >> (column * board.stride) & column_mask) << ((board.width - 1 - column) * board.stride)
+    return mirrored
+
+
+def canonical_key(board):
+    key = board.key()
+    return min(key, mirror(board, key))
+
+
+class OpeningBook:
+    """ Read-only view of a book file. """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.width, self.height, self.depth, self.count = HEADER.unpack_from(self.data, 0)
+        assert magic == MAGIC and version == VERSION, f'{path} is not an opening book.'
+
+    def __len__(self):
+        return self.count
+
+    def get(self, key, default=None):
+        """ Binary search of a key. """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, score = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+            if record_key == key:
+                return score
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return default
+
+    def best_move(self, board):
+        """
+        Picks the move whose resulting position is worst for the opponent.
+        :param board: BitBoard with the position to play. It is not modified.
+        :returns: The column, or None if the book doesn't cover every move of the position.
+        """
+        if (board.width, board.height) != (self.width, self.height) or board.moves >= self.depth:
+            return None
+        board = board.copy()
+        best_move, best_score = None, None
+        for column in range(board.width):
+            if not board.can_play(column):
+                continue
+            if board.is_winning_move(column):
+                return column
+            board.play(column)
+            score = self.get(canonical_key(board))
+            board.undo()
+            if score is None:
+                return None
+            if best_score is None or -score > best_score:
+                best_move, best_score = column, -score
+        return best_move
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+
+def positions(width, height, depth):
+    """
+    Every position with up to depth tokens where the game is still on, one per canonical key.
+    :returns: Dictionary mapping keys to bitboards.
+    """
+    found = {}
+    frontier = [BitBoard(width, height)]
+    for moves in range(depth + 1):
+        next_frontier = []
+        for board in frontier:
+            key = canonical_key(board)
+            if key in found:
+                continue
+            found[key] = board
+            if moves == depth:
+                continue
+            for column in range(width):
+                if board.can_play(column) and not board.is_winning_move(column):
+                    child = board.copy()
+                    child.play(column)
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return found
+
+
+_searcher = None
+
+
+def score(width, height, tokens, heights, turn, max_depth, time_budget):
+    """ Searches a position. Runs in the worker processes, which keep their transposition table between positions. """
+    global _searcher
+    if _searcher is None:
+        from negamax import Negamax  # The COM player imports the book.
+        _searcher = Negamax(time_budget, max_depth=max_depth)
+    board = BitBoard(width, height)
+    board.tokens, board.heights, board.turn = list(tokens), list(heights), turn
+    _searcher.search(board)
+    return _searcher.stats['score']
+
+
+def build(path, depth=6, max_depth=None, time_budget=0.5, width=7, height=6, workers=None):
+    """
+    Searches every position with up to depth tokens and writes the book.
+    :param path: Output file.
+    :param depth: Number of tokens on the board of the deepest positions in the book.
+    :param max_depth: Search depth limit per position, in plies.
+    :param time_budget: Seconds of search per position.
+    :param workers: Number of worker processes. Defaults to the number of cores.
+    :returns: Number of records.
+    """
+    found = positions(width, height, depth)
+    keys = sorted(found)
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        futures = [executor.submit(score, width, height, found[key].tokens, found[key].heights, found[key].turn,
+                                   max_depth, time_budget) for key in keys]
+        scores = [future.result() for future in futures]
+    with open(path, 'wb') as book:
+        book.write(HEADER.pack(MAGIC, VERSION, width, height, depth, len(keys)))
+        for key, value in zip(keys, scores):
+            book.write(RECORD.pack(key, value))
+    return len(keys)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Builds an opening book for the COM players.")
+    parser.add_argument('path', help="Output file.")
+    parser.add_argument('-d', '--depth', type=int, default=6, help="Number of tokens of the deepest positions.")
+    parser.add_argument('-m', '--max-depth', type=int, default=None, help="Search depth limit per position.")
+    parser.add_argument('-t', '--time', dest='time_budget', type=float, default=0.5, help="Seconds per position.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    count = build(args.path, args.depth, args.max_depth, args.time_budget, workers=args.workers)
+    print(f'{count} positions in {time.perf_counter() - start:.1f}s')
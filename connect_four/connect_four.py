@@ -1,6 +1,10 @@
+import contextlib
+
 import numpy
 import pygame
-import random
+
+from bitboard import BitBoard
+from players import PLAYERS, make_player
 
 
 class Board:
@@ -22,36 +26,78 @@ class Board:
         """
         self.width = width
         self.height = height
-        self.cells = numpy.zeros((height, width))
+        self.reset()
         self.surface = pygame.display.set_mode((self.cell_size * width, self.cell_size * (height + 1)))
         self.bgcolor = (0, 0, 0)
         self.fgcolor = (0, 0, 255)
         self.p1color = (255, 0, 0)
         self.p2color = (255, 255, 0)
         self.turn_indicator = (self.cell_size // 2, self.cell_size // 2)
+        self.colors = {-1: self.p2color, 0: self.bgcolor, 1: self.p1color}
+        self.radius = self.cell_size // 2 - self.cell_size // 10
+        # Everything that never changes (the blue board with empty holes) is drawn once.
+        self.background = pygame.Surface(self.surface.get_size())
+        self.background.fill(self.bgcolor)
+        pygame.draw.rect(self.background, self.fgcolor,
+                         (0, self.cell_size, self.width * self.cell_size, self.height * self.cell_size))
+        for y in range(0, self.height):
+            for x in range(0, self.width):
+                pygame.draw.circle(self.background, self.bgcolor, self.cell_center(y, x), self.radius)
+        # What is on the screen, to know what needs to be redrawn.
+        self.drawn_cells = None
+        self.drawn_indicator = None
 
     def __repr__(self):
         return str(self.cells)
 
+    def cell_center(self, row, column):
+        return column * self.cell_size + self.cell_size // 2, self.cell_size + row * self.cell_size + self.cell_size // 2
+
+    def cell_rect(self, row, column):
+        return pygame.Rect(column * self.cell_size, self.cell_size + row * self.cell_size, self.cell_size, self.cell_size)
+
     def draw(self):
-        self.surface.fill(self.bgcolor)
-        # Draw one big blue rectangle
-        pygame.draw.rect(self.surface, self.fgcolor,
-                         (0, self.cell_size, self.width * self.cell_size, self.height * self.cell_size))
-        for y in range(0, self.height):
-            for x in range(0, self.width):
-                pygame.draw.circle(self.surface,
-                                   {-1: self.p2color,
-                                    0: self.bgcolor,
-                                    1: self.p1color}[self.cells[y][x]],
-                                   (x * self.cell_size + self.cell_size // 2, self.cell_size + y * self.cell_size + self.cell_size // 2),
-                                   self.cell_size // 2 - self.cell_size // 10)
-        # Draw turn indicator
-        pygame.draw.circle(self.surface,
-                           {-1: self.p2color,
-                            1: self.p1color}[self.turn],
-                           self.turn_indicator,
-                           self.cell_size // 2 - self.cell_size // 10)
+        """
+        Draws the whole board.
+        :returns: List with the updated rectangle, for pygame.display.update.
+        """
+        self.surface.blit(self.background, (0, 0))
+        cells = self.cells
+        for y, x in zip(*numpy.nonzero(cells)):
+            pygame.draw.circle(self.surface, self.colors[cells[y, x]], self.cell_center(y, x), self.radius)
+        self.draw_turn_indicator()
+        self.drawn_cells = cells.copy()
+        return [self.surface.get_rect()]
+
+    def draw_changes(self):
+        """
+        Draws only the cells that changed since the last time and the turn indicator strip, if it moved.
+        :returns: List with the updated rectangles, for pygame.display.update.
+        """
+        cells = self.cells
+        if self.drawn_cells is None:
+            return self.draw()
+        rects = []
+        for y, x in zip(*numpy.nonzero(cells != self.drawn_cells)):
+            rect = self.cell_rect(y, x)
+            self.surface.blit(self.background, rect, rect)
+            pygame.draw.circle(self.surface, self.colors[cells[y, x]], self.cell_center(y, x), self.radius)
+            rects.append(rect)
+        if (self.turn_indicator, self.turn) != self.drawn_indicator:
+            rects.append(self.draw_turn_indicator())
+        self.drawn_cells = cells.copy()
+        return rects
+
+    def draw_turn_indicator(self):
+        """
+        Redraws the top row with the turn indicator.
+        :returns: Rectangle of the top row.
+        """
+        strip = pygame.Rect(0, 0, self.width * self.cell_size, self.cell_size)
+        self.surface.blit(self.background, strip, strip)
+        pygame.draw.circle(self.surface, self.colors[self.turn], self.turn_indicator, self.radius)
+        self.drawn_indicator = (self.turn_indicator, self.turn)
+        return strip
 
     def drop(self, pos):
         """
@@ -127,50 +173,125 @@ class Board:
         self.cells = numpy.zeros((self.height, self.width))
 
 
-def main(com):
+class FastBoard(Board):
+    """
+    Same board, but the game state is kept in a BitBoard instead of a matrix.
+    The matrix is still available through the cells property, so drawing works the same way.
+    """
+    def __init__(self, width, height):
+        self.state = BitBoard(width, height)
+        self.matrix = self.matrix_key = None  # Matrix of the last position asked for.
+        super().__init__(width, height)
+
+    @property
+    def cells(self):
+        """ Matrix of the position. It is only built again when a token is dropped, not on every frame. """
+        key = self.state.key()
+        if key != self.matrix_key:
+            self.matrix = self.state.cells
+            self.matrix_key = key
+        return self.matrix
+
+    @property
+    def turn(self):
+        return self.state.turn
+
+    @turn.setter
+    def turn(self, value):
+        self.state.turn = value
 
-    board = Board(7, 6)
+    def drop(self, pos):
+        return self.state.drop(pos)
+
+    def finished(self, row, column):
+        return self.state.finished(row, column)
+
+    def reset(self):
+        self.state.reset()
+
+
+def main(com, bitboard=False, player='random', time_budget=0.03, book=None, fps=30, profiler=None):
+    """
+    Game loop.
+    :param com: List of colors played by the computer.
+    :param bitboard: Keep the game state in a bitboard.
+    :param player: Name of the COM player (see players.PLAYERS).
+    :param time_budget: Seconds per move for the COM players that search.
+    :param book: Optional path of an opening book (see book.py).
+    :param fps: Maximum frames per second. Only what changed is redrawn on every frame.
+    :param profiler: frameprof.FrameProfiler that times every frame and shows it on the screen.
+    """
+    board = FastBoard(7, 6) if bitboard else Board(7, 6)
     pygame.init()
+    com_players = {{'red': 1, 'yellow': -1}[color]: make_player(player, time_budget=time_budget, book=book) for color in com or []}
+    phase = profiler.phase if profiler else contextlib.nullcontext
+    if profiler:
+        hudfont = pygame.font.SysFont(pygame.font.get_default_font(), 20)
+    # Without a clock, the loop runs as fast as the CPU can even when nothing happens.
+    clock = pygame.time.Clock()
 
     while not board.game_over:
+        clock.tick(fps)
+        if profiler:
+            profiler.frame()
         # COM players take their actions first, if activated and in their turn.
-        # TODO: refactor the game-over check.
-        if 'red' in com and board.turn == 1:
-            # Put a random piece. This doesn't even qualify as AI ... yet.
-            move = (random.randint(0, board.width * board.cell_size - 1), random.randint(0, board.height * board.cell_size - 1))
-            pos = board.drop(move)
-            if board.finished(*pos):
-                print("Game over")
-                board.game_over = True
-        if 'yellow' in com and board.turn == -1:
-            move = (random.randint(0, board.width * board.cell_size), random.randint(0, board.height * board.cell_size))
-            pos = board.drop(move)
-            if board.finished(*pos):
-                print("Game over")
-                board.game_over = True
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Check for window close.
-                pygame.quit()
-            if event.type == pygame.MOUSEMOTION:
-                # Move the turn marker across the top row
-                board.update_turn_indicator(event.pos)
-            if event.type == pygame.MOUSEBUTTONUP:
-                pos = board.drop(event.pos)
-                # Is the game ended?
+        with phase('update'):
+            if board.turn in com_players:
+                state = board.state.copy() if bitboard else BitBoard.from_cells(board.cells, board.turn)
+                if state.moves == board.width * board.height:
+                    print("Draw")
+                    board.game_over = True
+                    continue
+                com_player = com_players[board.turn]
+                column = com_player(state)
+                if com_player.stats:
+                    print(', '.join(f'{k}: {v:.3g}' if isinstance(v, float) else f'{k}: {v}' for k, v in com_player.stats.items()))
+                pos = board.drop((column * board.cell_size, 0))
                 if board.finished(*pos):
                     print("Game over")
                     board.game_over = True
+        # Handle events
+        with phase('events'):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:  # Check for window close.
+                    if profiler:
+                        profiler.close()
+                    pygame.quit()
+                if event.type == pygame.MOUSEMOTION:
+                    # Move the turn marker across the top row
+                    board.update_turn_indicator(event.pos)
+                if event.type == pygame.MOUSEBUTTONUP:
+                    pos = board.drop(event.pos)
+                    # Is the game ended?
+                    if pos is not None and board.finished(*pos):
+                        print("Game over")
+                        board.game_over = True
 
-
-        board.draw()
-        pygame.display.update()
+        with phase('draw'):
+            rects = board.draw_changes()
+        if profiler:
+            with phase('hud'):
+                rects.append(profiler.draw(board.surface, hudfont))
+        with phase('flip'):
+            if rects:
+                pygame.display.update(rects)
 
 
 if __name__ == "__main__":
     import argparse
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    import frameprof
     parser = argparse.ArgumentParser(description="Players take turns to try to connect 4 pieces of the same color in a line.")
     parser.add_argument('-c', dest='com', nargs='+', choices=['red', 'yellow'], required=False)
+    parser.add_argument('-b', '--bitboard', action='store_true', help="Keep the game state in a bitboard.")
+    parser.add_argument('-p', '--player', default='random', choices=sorted(PLAYERS), help="COM player.")
+    parser.add_argument('-t', '--time', dest='time_budget', type=float, default=0.03,
+                        help="Seconds per move for the COM players that search.")
+    parser.add_argument('--book', help="Opening book for the COM players that search.")
+    parser.add_argument('--fps', type=int, default=30, help="Maximum frames per second.")
+    frameprof.add_arguments(parser)
     args = parser.parse_args()
     print(args)
-    main(args.com)
+    main(args.com, args.bitboard, args.player, args.time_budget, args.book, args.fps, frameprof.from_arguments(args))
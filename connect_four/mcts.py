@@ -0,0 +1,187 @@
+"""
+Monte Carlo Tree Search COM player.
+
+Root parallelization: every worker process grows its own UCT tree from the current position with a different seed
+until the time budget runs out, and the visit counts of the root moves are added up afterwards. The trees are never
+shared, so the workers don't need to talk to each other while searching.
+"""
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard
+
+
+class Node:
+    """
+    A position in the search tree.
+    Wins are counted from the point of view of the player that made the move leading to this node.
+    """
+    __slots__ = ('move', 'parent', 'player', 'children', 'untried', 'visits', 'wins', 'winner')
+
+    def __init__(self, board, move=None, parent=None, winner=None):
+        self.move = move
+        self.parent = parent
+        self.player = -board.turn
+        self.children = []
+        self.winner = winner  # 1 or -1 if the move wins, 0 if it fills the board, None otherwise.
+        self.untried = [] if winner is not None else [c for c in range(board.width) if board.can_play(c)]
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, exploration):
+        """ UCT: picks the child with the best balance of win rate and how little it has been explored. """
+        log_visits = math.log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+
+def play(board, column):
+    """
+    Drops a token and tells if it ends the game.
+    :returns: Winner (1 or -1), 0 for a draw or None if the game goes on.
+    """
+    player = board.turn
+    board.play(column)
+    if board.won():
+        return player
+    if board.moves == board.width * board.height:
+        return 0
+    return None
+
+
+def grow(width, height, tokens, heights, turn, time_budget, exploration, seed):
+    """
+    Grows a UCT tree until the time budget runs out. Runs in the worker processes.
+    The position is sent as the masks, heights and turn of the board, so the workers get a small message instead of a
+    pickled board.
+    :returns: Tuple with the visits and wins of each root move, and the number of rollouts.
+    """
+    deadline = time.perf_counter() + time_budget
+    rng = random.Random(seed)
+    board = BitBoard(width, height)
+    board.tokens, board.heights, board.turn = list(tokens), list(heights), turn
+    root = Node(board)
+    rollouts = 0
+    while time.perf_counter() < deadline:
+        node = root
+        depth = 0
+        # Selection
+        while not node.untried and node.children:
+            node = node.select(exploration)
+            board.play(node.move)
+            depth += 1
+        # Expansion
+        winner = node.winner
+        if node.untried:
+            column = node.untried.pop(rng.randrange(len(node.untried)))
+            winner = play(board, column)
+            depth += 1
+            child = Node(board, column, node, winner)
+            node.children.append(child)
+            node = child
+        # Simulation
+        while winner is None:
+            winner = play(board, rng.choice([c for c in range(width) if board.can_play(c)]))
+            depth += 1
+        for _ in range(depth):
+            board.undo()
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            node.wins += 1.0 if winner == node.player else 0.5 if winner == 0 else 0.0
+            node = node.parent
+        rollouts += 1
+    return {child.move: (child.visits, child.wins) for child in root.children}, rollouts
+
+
+class MCTS:
+    """
+    Callable COM player: takes a BitBoard and returns the column with the most visits over all the workers.
+    After every search, the stats attribute holds the number of rollouts and the rollouts per second.
+    """
+    def __init__(self, time_budget=0.03, workers=None, exploration=1.4, seed=None, **options):
+        """
+        :param time_budget: Seconds per move.
+        :param workers: Number of worker processes. Defaults to the number of cores. With 1, it searches in-process.
+        :param exploration: UCT exploration constant.
+        :param seed: Seed for the rollouts.
+        """
+        self.time_budget = time_budget
+        self.workers = workers or os.cpu_count() or 1
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.executor = None
+        self.stats = {}
+
+    def __call__(self, board):
+        return self.search(board)
+
+    def search(self, board):
+        """
+        :param board: BitBoard with the position to play. It is not modified.
+        :returns: Column of the best move found.
+        """
+        start = time.perf_counter()
+        arguments = [(board.width, board.height, board.tokens, board.heights, board.turn, self.time_budget,
+                      self.exploration, self.random.getrandbits(64)) for _ in range(self.workers)]
+        if self.workers == 1:
+            results = [grow(*arguments[0])]
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers)
+            results = [future.result() for future in [self.executor.submit(grow, *a) for a in arguments]]
+
+        visits = {}
+        wins = {}
+        rollouts = 0
+        for children, count in results:
+            rollouts += count
+            for column, (v, w) in children.items():
+                visits[column] = visits.get(column, 0) + v
+                wins[column] = wins.get(column, 0.0) + w
+        if visits:
+            best_move = max(visits, key=visits.get)
+        else:
+            # No rollout finished in time: play the playable column closest to the center, like Negamax's ordering.
+            best_move = min((column for column in range(board.width) if board.can_play(column)),
+                            key=lambda column: abs(board.width // 2 - column))
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            'move': best_move,
+            'win_rate': wins[best_move] / visits[best_move] if visits else None,
+            'workers': self.workers,
+            'rollouts': rollouts,
+            'time': elapsed,
+            'rollouts_per_second': rollouts / elapsed if elapsed > 0 else 0.0,
+        }
+        return best_move
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def benchmark(time_budget=1.0, max_workers=None):
+    """
+    Prints the rollouts per second from the empty board with 1 to max_workers worker processes.
+    """
+    board = BitBoard()
+    for workers in range(1, (max_workers or os.cpu_count() or 1) + 1):
+        player = MCTS(time_budget, workers=workers, seed=0)
+        player(board)  # Warm up the pool.
+        player(board)
+        player.close()
+        print(f"{workers} workers: {player.stats['rollouts_per_second']:.0f} rollouts/s")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Measures how MCTS rollouts scale with the number of workers.")
+    parser.add_argument('-t', '--time', dest='time_budget', type=float, default=1.0, help="Seconds per search.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Maximum number of workers.")
+    args = parser.parse_args()
+    benchmark(args.time_budget, args.workers)
@@ -0,0 +1,226 @@
+"""
+Negamax COM player with alpha-beta pruning for the bitboard.
+
+The search deepens iteratively until the time budget runs out, and returns the best move found so far when the
+deadline hits. Positions are hashed with Zobrist keys into a fixed-size transposition table, so that the work done
+at one depth orders the moves of the next one and positions reached through different move orders are only searched
+once.
+"""
+import random
+import time
+
+from book import OpeningBook
+
+
+class SearchTimeout(Exception):
+    """ Raised inside the search when the deadline is hit. """
+
+
+class Negamax:
+    """
+    Callable COM player: takes a BitBoard and returns a column.
+    After every search, the stats attribute holds the depth reached, the number of nodes, the nodes per second and the
+    transposition table hit rate.
+    """
+    # Transposition table entry flags.
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+    # Score of a win. Faster wins score higher, and every win scores higher than any heuristic evaluation.
+    WIN = 10000
+
+    def __init__(self, time_budget=0.03, table_size=1 << 18, max_depth=None, seed=0, book=None, **options):
+        """
+        :param time_budget: Seconds per move.
+        :param table_size: Number of entries of the transposition table. Rounded up to a power of two.
+        :param max_depth: Optional limit to the search depth, in plies.
+        :param seed: Seed of the Zobrist keys.
+        :param book: Optional path of an opening book. Positions found in the book are played without searching.
+        """
+        self.book = OpeningBook(book) if book else None
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.table_size = 1 << max(0, table_size - 1).bit_length()
+        self.table = [None] * self.table_size
+        self.generation = 0
+        self.seed = seed
+        self.zobrist = None
+        self.weights = None
+        self.stats = {}
+
+    def __call__(self, board):
+        return self.search(board)
+
+    def prepare(self, board):
+        """
+        Builds the Zobrist keys and the evaluation masks the first time a board (or a board of a new size) shows up.
+        """
+        if self.zobrist and len(self.zobrist[0]) == board.width * board.stride:
+            return
+        rng = random.Random(self.seed)
+        self.zobrist = [[rng.getrandbits(64) for _ in range(board.width * board.stride)] for _ in range(2)]
+        self.order = sorted(range(board.width), key=lambda c: abs(board.width // 2 - c))  # Center columns first.
+        # Each cell is worth the number of four-in-a-row windows that contain it. Cells with the same weight share a mask.
+        masks = {}
+        for column in range(board.width):
+            for row in range(board.height):
+                weight = 0
+                for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                    for start in range(-3, 1):
+                        cells = [(column + dx * (start + i), row + dy * (start + i)) for i in range(4)]
+                        if all(0 <= c < board.width and 0 <= r < board.height for c, r in cells):
+                            weight += 1
+                masks[weight] = masks.get(weight, 0) | 1 << (column * board.stride + row)
+        self.weights = list(masks.items())
+
+    def hash(self, board):
+        """ Zobrist key of a position. """
+        key = 0
+        for player, tokens in enumerate(board.tokens):
+            for bit in range(board.width * board.stride):
+                if tokens >> bit & 1:
+                    key ^= self.zobrist[player][bit]
+        return key
+
+    def evaluate(self, board):
+        """ Heuristic score of a position from the point of view of the player to move. """
+        mine = board.tokens[(1 - board.turn) // 2]
+        theirs = board.tokens[(1 + board.turn) // 2]
+        return sum(weight * (bin(mine & mask).count('1') - bin(theirs & mask).count('1')) for weight, mask in self.weights)
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.table[key & (self.table_size - 1)]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, flag, value, move):
+        """
+        Depth-preferred replacement: an entry is only overwritten by a search at least as deep, unless it is left over
+        from a previous move.
+        """
+        slot = key & (self.table_size - 1)
+        entry = self.table[slot]
+        if entry is None or entry[0] == key or depth >= entry[1] or entry[5] != self.generation:
+            self.table[slot] = (key, depth, flag, value, move, self.generation)
+
+    def negamax(self, board, key, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 63 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        moves = board.moves
+        size = board.width * board.height
+        for column in self.order:
+            if board.can_play(column) and board.is_winning_move(column):
+                return self.WIN + size - moves
+        if moves >= size - 1:
+            return 0  # The last token can't connect four if the previous check failed: draw.
+        if depth == 0:
+            return self.evaluate(board)
+
+        alpha_orig = alpha
+        best_move = None
+        entry = self.probe(key)
+        if entry is not None:
+            best_move = entry[4]
+            if entry[1] >= depth:
+                if entry[2] == self.EXACT:
+                    return entry[3]
+                elif entry[2] == self.LOWER:
+                    alpha = max(alpha, entry[3])
+                else:
+                    beta = min(beta, entry[3])
+                if alpha >= beta:
+                    return entry[3]
+
+        best = -2 * self.WIN
+        player = (1 - board.turn) // 2
+        for column in self.ordered(best_move):
+            if not board.can_play(column):
+                continue
+            child = key ^ self.zobrist[player][column * board.stride + board.heights[column]]
+            board.play(column)
+            score = -self.negamax(board, child, depth - 1, -beta, -alpha)
+            board.undo()
+            if score > best:
+                best = score
+                best_move = column
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        flag = self.UPPER if best <= alpha_orig else self.LOWER if best >= beta else self.EXACT
+        self.store(key, depth, flag, best, best_move)
+        return best
+
+    def ordered(self, first):
+        """ Move ordering: the best move from the table first, then the center columns. """
+        if first is None:
+            return self.order
+        return [first] + [column for column in self.order if column != first]
+
+    def search(self, board):
+        """
+        Iterative deepening under the time budget.
+        :param board: BitBoard with the position to play. It is not modified.
+        :returns: Column of the best move found.
+        """
+        start = time.perf_counter()
+        if self.book is not None:
+            move = self.book.best_move(board)
+            if move is not None:
+                self.stats = {'move': move, 'book': True, 'time': time.perf_counter() - start}
+                return move
+        self.deadline = start + self.time_budget
+        self.prepare(board)
+        self.generation += 1
+        self.nodes = self.probes = self.hits = 0
+        board = board.copy()
+        key = self.hash(board)
+        player = (1 - board.turn) // 2
+        size = board.width * board.height
+        playable = [column for column in self.order if board.can_play(column)]
+        best_move, best_score, depth_reached = playable[0], 0, 0
+
+        max_depth = size - board.moves
+        if self.max_depth is not None:
+            max_depth = min(max_depth, self.max_depth)
+        for column in playable:  # Don't bother searching when there is a win on the board.
+            if board.is_winning_move(column):
+                best_move, best_score, max_depth = column, self.WIN + size - board.moves, 0
+                break
+        iteration_move = None
+        try:
+            for depth in range(1, max_depth + 1):
+                alpha, beta = -2 * self.WIN, 2 * self.WIN
+                iteration_move = None
+                for column in [best_move] + [c for c in playable if c != best_move]:
+                    child = key ^ self.zobrist[player][column * board.stride + board.heights[column]]
+                    board.play(column)
+                    score = -self.negamax(board, child, depth - 1, -beta, -alpha)
+                    board.undo()
+                    if score > alpha:
+                        alpha = score
+                        iteration_move = column
+                best_move, best_score, depth_reached = iteration_move, alpha, depth
+                if abs(best_score) > self.WIN // 2:
+                    break  # The game is solved from here, deeper searches won't change the result.
+        except SearchTimeout:
+            # The previous best move is searched first, so once it has a score at the new depth, any move that beats
+            # it in the unfinished iteration is a better choice.
+            if iteration_move is not None:
+                best_move, best_score = iteration_move, alpha
+
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            'move': best_move,
+            'score': best_score,
+            'depth': depth_reached,
+            'nodes': self.nodes,
+            'time': elapsed,
+            'nodes_per_second': self.nodes / elapsed if elapsed > 0 else 0.0,
+            'tt_hit_rate': self.hits / self.probes if self.probes else 0.0,
+        }
+        return best_move
@@ -0,0 +1,36 @@
+"""
+COM players.
+A player is a callable that takes a BitBoard with the position to play and returns the column where it drops its
+token. The board must not be modified.
+"""
+import random
+
+from mcts import MCTS
+from negamax import Negamax
+
+
+class RandomPlayer:
+    """ Drops the token in a random column. This doesn't even qualify as AI. """
+    def __init__(self, seed=None, **options):
+        self.random = random.Random(seed)
+        self.stats = {}
+
+    def __call__(self, board):
+        return self.random.choice([column for column in range(board.width) if board.can_play(column)])
+
+
+PLAYERS = {
+    'random': RandomPlayer,
+    'negamax': Negamax,
+    'mcts': MCTS,
+}
+
+
+def make_player(name, **options):
+    """
+    Builds a COM player by name.
+    :param name: One of the keys of PLAYERS.
+    :param options: Keyword arguments for the player, like time_budget or seed. Options a player doesn't use are ignored.
+    :returns: The player.
+    """
+    return PLAYERS[name](**options)
@@ -0,0 +1,21 @@
+"""
+Checks of the batch simulator, without a window:
+
+    python -m pytest test_batch_board.py
+"""
+import numpy
+
+from batch_board import BatchBoard
+
+
+def test_step_same_as_winners():
+    """ The wins found move by move, around the last token, are the ones a full check of the boards finds. """
+    rng = numpy.random.default_rng(0)
+    for boards, width, height in ((300, 7, 6), (300, 12, 10), (50, 20, 30)):
+        batch = BatchBoard(boards, width, height)
+        wins = 0
+        for _ in range(width * height):
+            batch.step(batch.random_columns(rng))
+            assert (batch.winner == batch.winners()).all()
+            wins += numpy.count_nonzero(batch.winner)
+        assert wins > 0
@@ -0,0 +1,64 @@
+"""
+Checks that the bitboard plays by the same rules as the numpy board, with SDL's dummy video driver so that no window
+opens:
+
+    python -m pytest test_bitboard.py
+"""
+import os
+import random
+from unittest import mock
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from bitboard import BitBoard
+from connect_four import Board, FastBoard
+
+
+def test_same_as_board():
+    """ On random games, both boards put the tokens in the same cells and see the same games end. """
+    rng = random.Random(0)
+    board = Board(7, 6)
+    wins = 0
+    with mock.patch('builtins.print'):  # Board.drop prints the board.
+        for _ in range(300):
+            board.reset()
+            board.turn = 1
+            bits = BitBoard(7, 6)
+            while True:
+                column = rng.randrange(7)
+                pos = board.drop((column * board.cell_size, 0))
+                assert bits.drop((column * bits.cell_size, 0)) == pos
+                if pos is None:
+                    continue  # Full column.
+                finished = board.finished(*pos)
+                assert bits.finished(*pos) == finished
+                assert bits.won() == finished
+                assert (bits.cells == board.cells).all()
+                if finished or bits.moves == 42:
+                    wins += finished
+                    break
+    assert wins > 250
+
+
+def test_from_cells():
+    """ A bitboard built from the matrix of another one is the same. """
+    rng = random.Random(1)
+    for width, height in ((7, 6), (5, 4), (8, 7)):
+        for _ in range(100):
+            bits = BitBoard(width, height)
+            for _ in range(rng.randrange(width * height)):
+                bits.play(rng.choice([column for column in range(width) if bits.can_play(column)]))
+            copy = BitBoard.from_cells(bits.cells, bits.turn)
+            assert (copy.tokens, copy.heights) == (bits.tokens, bits.heights)
+
+
+def test_fast_board_cells():
+    """ The matrix FastBoard keeps for drawing follows the drops and the resets. """
+    board = FastBoard(7, 6)
+    for column in (3, 3, 4):
+        board.drop((column * board.cell_size, 0))
+        assert (board.cells == board.state.cells).all()
+    assert board.cells[5, 3] == 1 and board.cells[4, 3] == -1 and board.cells[5, 4] == 1
+    board.reset()
+    assert not board.cells.any()
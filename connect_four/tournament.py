@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Headless COM-vs-COM Connect Four tournaments.
+
+Plays games between two COM players (see players.PLAYERS) on bitboards, so no window is ever opened, spread over a
+pool of worker processes. Every finished game is written as a line of JSON as soon as it comes in, and the win
+rates and games per second are printed at the end.
+
+    python tournament.py negamax random -n 200 -o results.jsonl
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bitboard import BitBoard
+from players import PLAYERS, make_player
+
+
+def play_game(game, names, time_budget, seed, book=None, width=7, height=6):
+    """
+    Plays one game. Runs in the worker processes.
+    The players swap colors every game, so that both get to start the same number of times.
+    :param game: Game number.
+    :param names: Names of the two players.
+    :param time_budget: Seconds per move for the players that search.
+    :param seed: Base seed for the players.
+    :param book: Optional path of an opening book.
+    :returns: Dictionary with the game's results.
+    """
+    seats = names if game % 2 == 0 else names[::-1]
+    # MCTS players search in-process: the tournament already keeps every core busy.
+    players = {1: make_player(seats[0], time_budget=time_budget, seed=seed + game, workers=1, book=book),
+               -1: make_player(seats[1], time_budget=time_budget, seed=seed + game + 1, workers=1, book=book)}
+    board = BitBoard(width, height)
+    winner = None
+    start = time.perf_counter()
+    while board.moves < width * height:
+        column = players[board.turn](board)
+        player = board.turn
+        board.play(column)
+        if board.won():
+            winner = player
+            break
+    duration = time.perf_counter() - start
+    for player in players.values():
+        if hasattr(player, 'close'):
+            player.close()
+    return {
+        'game': game,
+        'red': seats[0],
+        'yellow': seats[1],
+        'moves': board.history,
+        'winner': {1: 'red', -1: 'yellow', None: None}[winner],
+        # Seat in the names list of the winner: 0 for the first player, 1 for the second one.
+        'winner_seat': None if winner is None else (0 if (winner == 1) == (game % 2 == 0) else 1),
+        'duration': duration,
+    }
+
+
+def run(names, games, workers=None, time_budget=0.03, seed=0, output=None, book=None):
+    """
+    Plays a tournament.
+    :param names: Names of the two players.
+    :param games: Number of games.
+    :param workers: Number of worker processes. Defaults to the number of cores.
+    :param time_budget: Seconds per move for the players that search.
+    :param seed: Base seed for the players.
+    :param output: File object where the results are written as JSON lines, or None.
+    :param book: Optional path of an opening book, shared by all the workers.
+    :returns: Dictionary with the number of wins of each seat, the draws, and the games per second.
+    """
+    wins = [0, 0]
+    draws = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        futures = [executor.submit(play_game, game, names, time_budget, seed, book) for game in range(games)]
+        for future in as_completed(futures):
+            result = future.result()
+            if result['winner_seat'] is None:
+                draws += 1
+            else:
+                wins[result['winner_seat']] += 1
+            if output is not None:
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    elapsed = time.perf_counter() - start
+    return {'wins': wins, 'draws': draws, 'games_per_second': games / elapsed}
+
+
+def main(names, games, workers=None, time_budget=0.03, seed=0, output=None, book=None):
+    out = open(output, 'w') if output else None
+    try:
+        summary = run(names, games, workers, time_budget, seed, out, book)
+    finally:
+        if out is not None:
+            out.close()
+    # Players are numbered in the order they were given: who moves first changes from one game to the next.
+    for seat, name in enumerate(names):
+        print(f'Player {seat + 1} ({name}): {summary["wins"][seat] / games:.1%} wins')
+    print(f'Draws: {summary["draws"] / games:.1%}')
+    print(f'{summary["games_per_second"]:.2f} games/s')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Plays COM-vs-COM games without a window.")
+    parser.add_argument('players', nargs=2, choices=sorted(PLAYERS), help="The two COM players.")
+    parser.add_argument('-n', '--games', type=int, default=100, help="Number of games.")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="Number of worker processes.")
+    parser.add_argument('-t', '--time', dest='time_budget', type=float, default=0.03,
+                        help="Seconds per move for the COM players that search.")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="Base seed for the COM players.")
+    parser.add_argument('-o', '--output', help="JSONL file for the results of every game.")
+    parser.add_argument('--book', help="Opening book for the COM players that search.")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error('Play at least one game.')
+    main(args.players, args.games, args.workers, args.time_budget, args.seed, args.output, args.book)
@@ -0,0 +1,153 @@
+"""
+Per-frame timing of the game loops, to tell whether a slow frame comes from the event queue, the game logic or the
+drawing. Shared by the three games: their --profile options put this directory on sys.path.
+
+The loop calls frame at the start of every frame, and wraps each part of it in phase:
+
+    profiler.frame()
+    with profiler.phase('events'):
+        ...
+
+A heads-up display shows the frames per second, the 50th and 99th percentiles of the frame time (from the start of a
+frame to the start of the next, waiting included) and of the work (the phases alone), and how long each phase takes
+on average, over the last few seconds. Every frame can also be saved to a CSV file, and the whole run profiled with
+cProfile.
+"""
+import atexit
+import cProfile
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PHASES = ('events', 'update', 'draw', 'flip', 'hud')
+
+
+class FrameProfiler:
+    """ Times the phases of every frame. """
+    def __init__(self, phases=PHASES, csv=None, stats=None, window=300, refresh=0.25):
+        """
+        :param phases: Names of the phases, in the order they are shown.
+        :param csv: Path of a CSV file where the times of every frame are saved when the game ends.
+        :param stats: Path of a file where cProfile stats of the whole run are saved when the game ends (see pstats).
+        :param window: Number of frames the display is about.
+        :param refresh: Seconds between updates of the display.
+        """
+        self.phases = phases
+        self.csv = csv
+        self.stats = stats
+        self.refresh = refresh
+        self.recent = deque(maxlen=window)
+        self.frames = [] if csv else None
+        self.times = dict.fromkeys(phases, 0.0)
+        self.started = None
+        self.panel = None  # Last display, and when it was made.
+        self.panel_time = 0
+        self.closed = False
+        self.profile = None
+        if stats:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        atexit.register(self.close)  # The games end in many ways, some of them through sys.exit.
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+
+    def frame(self):
+        """ Starts a frame, which ends the previous one. """
+        now = time.perf_counter()
+        if self.started is not None:
+            times = [self.times[name] for name in self.phases]
+            sample = (now - self.started, sum(times), *times)
+            self.recent.append(sample)
+            if self.frames is not None:
+                self.frames.append((self.started, *sample))
+        self.started = now
+        self.times = dict.fromkeys(self.phases, 0.0)
+
+    def lines(self):
+        """ Text of the display. """
+        if not self.recent:
+            return ['Measuring...']
+
+        def percentiles(values):
+            values = sorted(values)
+            return (values[len(values) // 2] * 1e3, values[min(len(values) - 1, len(values) * 99 // 100)] * 1e3)
+
+        frames = [sample[0] for sample in self.recent]
+        work = [sample[1] for sample in self.recent]
+        means = [sum(sample[i] for sample in self.recent) / len(self.recent) * 1e3 for i in range(2, 2 + len(self.phases))]
+        return [f'FPS {len(frames) / sum(frames):.1f}',
+                'frame p50 {:.1f} p99 {:.1f} ms'.format(*percentiles(frames)),
+                'work p50 {:.2f} p99 {:.2f} ms'.format(*percentiles(work)),
+                *(f'{name} {mean:.2f} ms' for name, mean in zip(self.phases, means))]
+
+    def draw(self, surface, font, color=(255, 255, 255), bgcolor=(0, 0, 0)):
+        """
+        Draws the display on the top-right corner of a pygame surface. The text is only rendered again every refresh
+        seconds, but the display is drawn on every frame, since the game may have drawn over it.
+        :param font: pygame font.
+        :returns: Rectangle of the display.
+        """
+        import pygame
+        now = time.perf_counter()
+        if self.panel is None or now - self.panel_time >= self.refresh:
+            texts = [font.render(line, True, color, bgcolor) for line in self.lines()]
+            # It only grows, so that it always covers what it showed before.
+            width = max([text.get_width() + 8 for text in texts] + [self.panel.get_width() if self.panel else 0])
+            height = max(sum(text.get_height() for text in texts) + 8, self.panel.get_height() if self.panel else 0)
+            self.panel = pygame.Surface((width, height))
+            self.panel.fill(bgcolor)
+            y = 4
+            for text in texts:
+                self.panel.blit(text, (4, y))
+                y += text.get_height()
+            self.panel_time = now
+        rect = self.panel.get_rect(topright=(surface.get_width(), 0))
+        surface.blit(self.panel, rect)
+        return rect
+
+    def write(self, writer, font=('Courier', 10, 'normal')):
+        """
+        Writes the display with a turtle, every refresh seconds.
+        :param writer: Hidden turtle, placed where the display goes. Its lines grow upwards from there.
+        """
+        now = time.perf_counter()
+        if now - self.panel_time >= self.refresh:
+            writer.clear()
+            writer.write('\n'.join(self.lines()), font=font)
+            self.panel_time = now
+
+    def close(self):
+        """ Saves the CSV file and the cProfile stats, if asked to, and prints a summary. """
+        if self.closed:
+            return
+        self.closed = True
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.stats)
+        if self.frames is not None:
+            with open(self.csv, 'w') as f:
+                f.write(','.join(('start', 'frame', 'work', *self.phases)) + '\n')
+                for sample in self.frames:
+                    f.write(','.join(f'{value:.6f}' for value in sample) + '\n')
+        print('\n'.join(self.lines()))
+
+
+def add_arguments(parser):
+    """ Adds the profiling options to a game's argparse parser. """
+    parser.add_argument('--profile', action='store_true',
+                        help="Show the frame rate and how long each part of a frame takes.")
+    parser.add_argument('--profile-csv', metavar='PATH', help="Save the times of every frame to a CSV file.")
+    parser.add_argument('--profile-stats', metavar='PATH', help="Profile the whole game with cProfile.")
+
+
+def from_arguments(args, phases=PHASES):
+    """ FrameProfiler for the options given, or None if profiling isn't on. """
+    if args.profile or args.profile_csv or args.profile_stats:
+        return FrameProfiler(phases, args.profile_csv, args.profile_stats)
+    return None
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Computer player for pong.
+
+Since the ball goes straight between bounces, where it will cross a paddle's side can be worked out at once instead of
+simulating it frame by frame: unfold the walls, so that the ball goes straight through them into mirrored copies of
+the field, find the height where it gets to the paddle, and fold it back. Folding is a triangle wave with a period of
+four times the distance from the middle to a wall.
+
+The same code works on numbers (physics.PongState) and on numpy arrays (vector_pong.VectorPong), so a tweak can be
+tried on thousands of rallies at once before playing against it:
+
+    python ai.py -n 100000 --speed 250 --no-anticipate
+"""
+from physics import DT, WALL, PADDLE_X
+
+PADDLE_SPEED = 300  # Pixels per second.
+
+
+def fold(y):
+    """ Height where a ball that went straight to y through the walls really is, bouncing on them. """
+    return WALL - abs((y + WALL) % (4 * WALL) - 2 * WALL)
+
+
+class Computer:
+    """ Moves a paddle toward where the ball will get to it. """
+    def __init__(self, player, speed=PADDLE_SPEED, anticipate=True):
+        """
+        :param player: 1 for the left paddle, 2 for the right one.
+        :param speed: How fast the paddle can go, in pixels per second.
+        :param anticipate: While the ball goes away, wait where it will come back if the other player hits it.
+                           Otherwise, wait in the middle.
+        """
+        self.player = player
+        self.speed = speed
+        self.anticipate = anticipate
+        self.side = -PADDLE_X if player == 1 else PADDLE_X
+
+    def target(self, x, y, dx, dy):
+        """
+        Height where the ball will get to the paddle. Takes numbers or numpy arrays.
+        """
+        coming = (dx * self.side) > 0
+        distance = abs(self.side - x)
+        with_dx = abs(dx) + (dx == 0)  # The ball never stops on the X-axis, but don't divide by zero.
+        if self.anticipate:
+            # Going away, it has to get to the other side and come back.
+            distance = distance + (4 * PADDLE_X - 2 * distance) * (1 - coming)
+            return fold(y + dy * distance / with_dx)
+        return fold(y + dy * distance / with_dx) * coming
+
+    def __call__(self, state, dt=DT):
+        """
+        :param state: physics.PongState.
+        :param dt: Seconds until the next decision.
+        :returns: How much to move the paddle.
+        """
+        reach = self.speed * dt
+        move = self.target(state.x, state.y, state.dx, state.dy) - state.paddles[self.player - 1]
+        return max(-reach, min(reach, move))
+
+    def moves(self, pong, dt=DT):
+        """
+        :param pong: vector_pong.VectorPong.
+        :param dt: Seconds until the next decision.
+        :returns: Array with how much to move the paddle on every match.
+        """
+        import numpy
+        reach = self.speed * dt
+        move = self.target(pong.x, pong.y, pong.dx, pong.dy) - pong.paddles[:, self.player - 1]
+        return numpy.clip(move, -reach, reach)
+
+
+def evaluate(computers, rallies=100000, matches=4096, ball=800, longest=10, dt=1 / 30, seed=0):
+    """
+    Plays rallies between two computer players and prints how they did.
+    Every rally starts with a random serve from the middle, and ends when a player misses the ball or after a number of
+    hits, which counts as a draw.
+    :param computers: Computer for each player.
+    :param ball: Speed of the ball on the X-axis, in pixels per second.
+    :param longest: Hits in the longest rally.
+    :param dt: Seconds per step. The collisions don't depend on it, only how often the players decide.
+    """
+    import time
+    import numpy
+    from vector_pong import VectorPong
+
+    pong = VectorPong(matches, ball, seed=seed)
+    moves = numpy.empty((matches, 2))
+    missed = numpy.zeros(2, dtype=numpy.int64)
+    played = draws = 0
+    start = time.perf_counter()
+    while played < rallies:
+        moves[:, 0] = computers[0].moves(pong, dt)
+        moves[:, 1] = computers[1].moves(pong, dt)
+        scored = pong.step(moves, dt)
+        missed += numpy.bincount(scored, minlength=3)[2:0:-1]  # A point for player 1 is a miss for player 2.
+        drawn = pong.rally >= longest
+        draws += drawn.sum()
+        ended = pong.index[(scored > 0) | drawn]
+        played += len(ended)
+        pong.reset(ended)  # New random serve.
+    elapsed = time.perf_counter() - start
+    returns = pong.returns.sum(axis=0)
+    print(f'{played} rallies in {elapsed:.1f}s ({played / elapsed:.0f} rallies/s), '
+          f'{returns.sum() / played:.1f} hits per rally, {draws / played:.1%} drawn')
+    for i, computer in enumerate(computers):
+        print(f'Player {i + 1} (speed {computer.speed:g}{", anticipating" if computer.anticipate else ""}): '
+              f'returned {returns[i] / (returns[i] + missed[i]):.1%}, missed {missed[i]}')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Plays rallies between a tweaked computer player and the default one.")
+    parser.add_argument('-n', '--rallies', type=int, default=100000, help="Number of rallies.")
+    parser.add_argument('--speed', type=float, default=PADDLE_SPEED, help="Paddle speed of the tweaked player.")
+    parser.add_argument('--no-anticipate', action='store_true', help="The tweaked player waits in the middle.")
+    parser.add_argument('--ball', type=float, default=800, help="Ball speed on the X-axis.")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="Seed for the serves.")
+    args = parser.parse_args()
+    evaluate([Computer(1, args.speed, not args.no_anticipate), Computer(2)], args.rallies, ball=args.ball,
+             seed=args.seed)
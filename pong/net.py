@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Pong over the network.
+
+The server runs the game: one asyncio task steps every match on the same tick, the clients only send their paddle's
+moves. The server pairs the players as they connect, and runs as many matches as the CPU can step in a tick.
+
+Protocol, over TCP (the deltas need every message, in order):
+
+- Server to client, once both players are there: HELLO, with the player number (1: left paddle, 2: right paddle)
+  and the points to win.
+- Client to server: INPUT, with a sequence number and how much to move the paddle.
+- Server to client, every tick: a header with the tick and a bit mask, followed by only the fields (see FIELDS) that
+  changed since the last message. Usually that's just the ball's position: 8 bytes.
+
+Clients move their own paddle as soon as a key is pressed (prediction). Every message from the server says the last
+move it applied (ack), so the client puts its paddle where the server has it and applies again the moves the server
+hasn't seen yet (reconciliation).
+
+    python net.py server --port 9999
+    python net.py bots -n 100 --port 9999     # 100 matches between computer players.
+    python pong.py --connect localhost:9999   # Play.
+"""
+import asyncio
+import socket
+import struct
+import time
+from collections import deque
+
+from physics import PongState, DT, POINTS, PADDLE_REACH
+
+HELLO = struct.Struct('<4sBB')  # Magic, player, points to win.
+MAGIC = b'PONG'
+INPUT = struct.Struct('<Ih')  # Sequence number, paddle move in pixels.
+HEADER = struct.Struct('<HH')  # Tick (it wraps around), mask of the fields that follow.
+FIELDS = ('h', 'h', 'h', 'h', 'h', 'h', 'B', 'B', 'I')  # Ball x, y, dx, dy, paddles, scores, ack.
+SCALE = 16  # Positions are sent in sixteenths of a pixel.
+MAX_MOVE = 20  # Pixels per input, as much as a key press.
+MAX_BUFFER = 1 << 16  # Clients that get this many bytes behind are dropped.
+STRUCTS = {}  # Struct of the fields of each mask.
+
+
+def fields(mask):
+    """ Struct with the fields given by a mask. """
+    if mask not in STRUCTS:
+        STRUCTS[mask] = struct.Struct('<' + ''.join(f for i, f in enumerate(FIELDS) if mask >> i & 1))
+    return STRUCTS[mask]
+
+
+def snapshot(state, ack):
+    """ Values of the fields for a state. """
+    return (round(state.x * SCALE), round(state.y * SCALE), round(state.dx), round(state.dy),
+            round(state.paddles[0] * SCALE), round(state.paddles[1] * SCALE), *state.scores, ack)
+
+
+def encode(tick, previous, values):
+    """
+    Message with the fields that changed.
+    :param previous: Values sent in the last message, or None to send them all.
+    """
+    mask = 0
+    changed = []
+    for i, value in enumerate(values):
+        if previous is None or previous[i] != value:
+            mask |= 1 << i
+            changed.append(value)
+    return HEADER.pack(tick & 0xffff, mask) + fields(mask).pack(*changed)
+
+
+def clamp(move):
+    return max(-MAX_MOVE, min(MAX_MOVE, int(move)))
+
+
+class Client:
+    """
+    The client's side of the protocol, without any networking: bytes from the server go in through feed, and move
+    returns the bytes to send. The game as the client sees it is in state.
+    """
+    def __init__(self):
+        self.player = None  # Not before HELLO.
+        self.state = PongState()
+        self.values = [0] * len(FIELDS)
+        self.tick = 0
+        self.sequence = 0
+        self.pending = deque()  # Moves the server hasn't applied yet.
+        self.buffer = bytearray()
+
+    def move(self, dy):
+        """
+        Moves the paddle right away.
+        :param dy: Pixels to add to the position of the paddle, up to MAX_MOVE either way.
+        :returns: Bytes to send to the server.
+        """
+        dy = clamp(dy)
+        self.sequence += 1
+        self.state.move_paddle(self.player, dy)
+        self.pending.append((self.sequence, dy))
+        return INPUT.pack(self.sequence, dy)
+
+    def feed(self, data):
+        """
+        Takes bytes from the server.
+        :returns: Number of ticks received.
+        """
+        self.buffer += data
+        offset = 0
+        if self.player is None:
+            if len(self.buffer) < HELLO.size:
+                return 0
+            magic, self.player, self.state.points = HELLO.unpack_from(self.buffer)
+            assert magic == MAGIC, 'Not a pong server.'
+            offset = HELLO.size
+        ticks = 0
+        while len(self.buffer) - offset >= HEADER.size:
+            tick, mask = HEADER.unpack_from(self.buffer, offset)
+            body = fields(mask)
+            if len(self.buffer) - offset - HEADER.size < body.size:
+                break
+            changed = iter(body.unpack_from(self.buffer, offset + HEADER.size))
+            for i in range(len(FIELDS)):
+                if mask >> i & 1:
+                    self.values[i] = next(changed)
+            offset += HEADER.size + body.size
+            self.tick = tick
+            ticks += 1
+        del self.buffer[:offset]
+        if ticks:
+            self.apply()
+        return ticks
+
+    def apply(self):
+        """ Puts the last values from the server in the state, then applies again the moves the server hasn't seen. """
+        x, y, dx, dy, paddle1, paddle2, score1, score2, ack = self.values
+        state = self.state
+        state.previous = (state.x, state.y)
+        state.x, state.y, state.dx, state.dy = x / SCALE, y / SCALE, dx, dy
+        state.paddles = [paddle1 / SCALE, paddle2 / SCALE]
+        state.scores = [score1, score2]
+        while self.pending and self.pending[0][0] <= ack:
+            self.pending.popleft()
+        for _, move in self.pending:
+            state.move_paddle(self.player, move)
+
+
+class Seat:
+    """ A connected player. """
+    def __init__(self, writer):
+        self.writer = writer
+        self.player = None
+        self.match = None
+
+
+class Match:
+    """ A game between two seats. """
+    def __init__(self, seats, points=POINTS):
+        self.state = PongState(points=points)
+        self.seats = seats
+        self.inputs = [[], []]  # Moves received since the last tick.
+        self.acks = [0, 0]
+        self.sent = [None, None]  # Values in the last message to each player.
+        for player, seat in enumerate(seats, 1):
+            seat.player = player
+            seat.match = self
+            seat.writer.write(HELLO.pack(MAGIC, player, points))
+
+    def tick(self):
+        """
+        Applies the moves, steps the game and sends the changes to the players.
+        :returns: Bytes sent.
+        """
+        state = self.state
+        for i, inputs in enumerate(self.inputs):
+            for sequence, move in inputs:
+                state.move_paddle(i + 1, clamp(move))
+                self.acks[i] = sequence
+            inputs.clear()
+        state.step(DT)
+        sent = 0
+        for i, seat in enumerate(self.seats):
+            values = snapshot(state, self.acks[i])
+            message = encode(state.ticks, self.sent[i], values)
+            self.sent[i] = values
+            seat.writer.write(message)
+            sent += len(message)
+        return sent
+
+    def close(self):
+        for seat in self.seats:
+            seat.writer.close()
+
+
+class Server:
+    """ Pairs the players and steps all the matches. """
+    def __init__(self, points=POINTS, report=5):
+        """
+        :param points: Points to win a match.
+        :param report: Seconds between the stats printed, or 0 for none.
+        """
+        self.points = points
+        self.matches = set()
+        self.waiting = None  # Seat waiting for a rival.
+        self.report = report
+        self.finished = 0
+
+    async def handle(self, reader, writer):
+        """ Takes the moves of a player until it disconnects. """
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        seat = Seat(writer)
+        if self.waiting is None:
+            self.waiting = seat
+        else:
+            self.matches.add(Match([self.waiting, seat], self.points))
+            self.waiting = None
+        try:
+            while True:
+                data = await reader.readexactly(INPUT.size)
+                if seat.match is not None:
+                    seat.match.inputs[seat.player - 1].append(INPUT.unpack(data))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if self.waiting is seat:
+            self.waiting = None
+        self.end(seat.match)
+        writer.close()
+
+    def end(self, match):
+        if match in self.matches:
+            self.matches.discard(match)
+            match.close()
+            self.finished += 1
+
+    async def run(self):
+        """ The tick loop. """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        times = []
+        sent = 0
+        last_report = time.perf_counter()
+        while True:
+            start = time.perf_counter()
+            for match in list(self.matches):
+                sent += match.tick()
+                if match.state.over or any(seat.writer.transport.get_write_buffer_size() > MAX_BUFFER
+                                           for seat in match.seats):
+                    self.end(match)
+            times.append(time.perf_counter() - start)
+            if self.report and start - last_report >= self.report:
+                print(f'{len(self.matches)} matches, {self.finished} finished, tick: {sum(times) / len(times) * 1e3:.2f} ms '
+                      f'average, {max(times) * 1e3:.2f} ms max, {sent / (start - last_report) / 1024:.0f} KiB/s out')
+                times.clear()
+                sent = 0
+                last_report = start
+            # Ticks keep a steady pace. If the server falls far behind, it gives up on catching up.
+            deadline = max(deadline + DT, loop.time() - 0.25)
+            await asyncio.sleep(deadline - loop.time())
+
+    async def serve(self, host='0.0.0.0', port=9999):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await self.run()
+
+
+async def bot(host, port, speed, seed=None):
+    """
+    A computer player over the network. To miss now and then, it aims at a random point up to a bit more than half a
+    paddle away from where the ball will get, drawn again every time the ball changes direction.
+    :param speed: Paddle speed of the computer player, in pixels per second.
+    :returns: The Client at the end of the match.
+    """
+    import random
+    from ai import Computer
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    client = Client()
+    state = client.state
+    computer = None
+    heading = offset = 0
+    reach = speed * DT
+    while not state.over:
+        try:
+            data = await reader.read(1 << 12)
+        except ConnectionError:  # The server closed the match while a move was on its way.
+            break
+        if not data:
+            break
+        if not client.feed(data):
+            continue
+        if computer is None:
+            computer = Computer(client.player, speed)
+        if state.dx != heading:
+            heading = state.dx
+            offset = rng.uniform(-1.2, 1.2) * PADDLE_REACH
+        move = computer.target(state.x, state.y, state.dx, state.dy) + offset - state.paddles[client.player - 1]
+        move = round(max(-reach, min(reach, move)))
+        if move:
+            writer.write(client.move(move))
+    writer.close()
+    return client
+
+
+async def bots(matches, host, port, seed=None):
+    """
+    Plays matches between computer players with random paddle speeds, and prints how long they took.
+    """
+    import random
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    clients = await asyncio.gather(*(bot(host, port, rng.uniform(100, 300), rng.random()) for _ in range(2 * matches)))
+    finished = sum(client.state.over for client in clients) // 2
+    print(f'{finished}/{matches} matches finished in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Pong server, and computer players to test it.")
+    parser.add_argument('mode', choices=['server', 'bots'])
+    parser.add_argument('--host', default='localhost', help="Address to listen on, or of the server.")
+    parser.add_argument('-p', '--port', type=int, default=9999)
+    parser.add_argument('-n', '--matches', type=int, default=100, help="Matches the bots play.")
+    parser.add_argument('--points', type=int, default=POINTS, help="Points to win a match, on the server.")
+    args = parser.parse_args()
+    if args.mode == 'server':
+        asyncio.run(Server(args.points).serve(args.host, args.port))
+    else:
+        asyncio.run(bots(args.matches, args.host, args.port))
@@ -0,0 +1,159 @@
+"""
+Rules of the pong game, without turtle.
+The whole game lives in PongState, which only moves forward by a fixed time step (DT), so the game plays the same on
+slow and fast machines, and it can be simulated without opening a window.
+
+Coordinates are the ones of the turtle window: the origin is in the middle, x grows to the right and y upwards.
+
+Collisions are swept: instead of checking for overlaps after moving, each step looks for the first obstacle on the
+segment the ball goes along, moves it there, bounces it and goes on with the time left. The ball can't go through a
+paddle or a wall however fast it goes or however long the step, so steps can be long.
+"""
+import math
+
+DT = 1 / 60  # Seconds per physics step.
+SPEED = 200  # Ball speed on each axis, in pixels per second.
+WALL = 290  # The ball bounces on the floor and the ceiling when its center gets this far from the middle.
+GOAL = 350  # A player scores when the ball's center goes this far past the middle on the other side.
+PADDLE_X = 340  # Front side of the paddles: the ball bounces when its center gets there...
+PADDLE_REACH = 50  # ... if it is closer than this to the paddle's center on the Y-axis.
+PADDLE_WIDTH = 20
+PADDLE_LIMIT = 250  # How far the paddles can go up or down.
+POINTS = 10  # Points to win.
+MAX_BOUNCES = 32  # Per step, in case the ball ever gets stuck in a corner.
+
+
+def slab(p, v, low, high):
+    """
+    When a point moving on an axis is between two values.
+    :returns: Tuple with the times it gets in and out and the value it gets in through, or None if it never is.
+    """
+    if v == 0:
+        return (-math.inf, math.inf, None) if low < p < high else None
+    if v > 0:
+        return (low - p) / v, (high - p) / v, low
+    return (high - p) / v, (low - p) / v, high
+
+
+def sweep(x, y, dx, dy, left, bottom, right, top):
+    """
+    When a point moving from (x, y) with velocity (dx, dy) gets into a box.
+    :returns: Tuple with the time, the axis ('x' or 'y') of the side it goes through and the position of that side, or
+              None if it never gets in, only grazes it, or is already inside.
+    """
+    slab_x = slab(x, dx, left, right)
+    slab_y = slab(y, dy, bottom, top)
+    if slab_x is None or slab_y is None:
+        return None
+    t_in = max(slab_x[0], slab_y[0])
+    if t_in < 0 or t_in >= min(slab_x[1], slab_y[1]):
+        return None
+    return (t_in, 'x', slab_x[2]) if slab_x[0] >= slab_y[0] else (t_in, 'y', slab_y[2])
+
+
+class PongState:
+    """
+    The ball, the paddles and the score.
+    The ball is a point with a velocity in pixels per second. The paddles only move up and down, and are given by the Y
+    coordinate of their centers: the first player's is on the left, the second player's on the right.
+    """
+    def __init__(self, speed=SPEED, points=POINTS):
+        """
+        :param speed: Ball speed on each axis, in pixels per second.
+        :param points: Points to win.
+        """
+        self.speed = speed
+        self.points = points
+        self.paddles = [0, 0]
+        self.scores = [0, 0]
+        self.ticks = 0
+        self.x = self.y = 0
+        self.dx = self.dy = speed
+        self.previous = (0, 0)  # Position of the ball before the last step, to draw in between steps.
+
+    @property
+    def over(self):
+        return max(self.scores) >= self.points
+
+    @property
+    def winner(self):
+        """ Player (1 or 2) ahead on the score. """
+        return 1 if self.scores[0] > self.scores[1] else 2
+
+    def move_paddle(self, player, dy):
+        """
+        Moves a paddle up or down, without leaving the screen.
+        :param player: 1 or 2.
+        :param dy: Add this to the Y-axis position. Negative values make the paddle go down.
+        """
+        y = self.paddles[player - 1] + dy
+        self.paddles[player - 1] = max(-PADDLE_LIMIT, min(PADDLE_LIMIT, y))
+
+    def serve(self):
+        """ Puts the ball back in the middle, going the other way. """
+        self.x = self.y = 0
+        self.previous = (0, 0)
+        self.dx = -self.dx
+
+    def position(self, alpha=1):
+        """
+        Position of the ball between the last two steps, for drawing.
+        :param alpha: 0 for the position before the last step, 1 for the current one.
+        """
+        x, y = self.previous
+        return x + (self.x - x) * alpha, y + (self.y - y) * alpha
+
+    def paddle_box(self, player):
+        """ (left, bottom, right, top) of a paddle. """
+        y = self.paddles[player - 1]
+        if player == 1:
+            return -PADDLE_X - PADDLE_WIDTH, y - PADDLE_REACH, -PADDLE_X, y + PADDLE_REACH
+        return PADDLE_X, y - PADDLE_REACH, PADDLE_X + PADDLE_WIDTH, y + PADDLE_REACH
+
+    def hits(self):
+        """
+        Obstacles on the way of the ball, if it kept going straight forever.
+        Only the ones the ball goes toward count, so it can't get stuck bouncing back and forth inside one.
+        :returns: Generator of tuples with the time to get there, the axis to bounce on ('x', 'y') or 'goal', and the
+                  position of the obstacle on that axis. The paddles come first, so they win ties.
+        """
+        for player in (1, 2):
+            hit = sweep(self.x, self.y, self.dx, self.dy, *self.paddle_box(player))
+            if hit is not None:
+                yield hit
+        if self.dy:
+            wall = WALL if self.dy > 0 else -WALL
+            yield max(0, (wall - self.y) / self.dy), 'y', wall
+        if self.dx:
+            goal = GOAL if self.dx > 0 else -GOAL
+            yield max(0, (goal - self.x) / self.dx), 'goal', goal
+
+    def step(self, dt=DT):
+        """
+        Moves the ball, bouncing it off the walls and the paddles as many times as needed.
+        :param dt: Seconds to move forward.
+        :returns: Player who scored on this step (1 or 2), or None.
+        """
+        self.ticks += 1
+        self.previous = (self.x, self.y)
+        left = dt
+        for _ in range(MAX_BOUNCES):
+            t, axis, plane = min(self.hits(), key=lambda hit: hit[0], default=(math.inf, None, None))
+            if t > left:
+                self.x += self.dx * left
+                self.y += self.dy * left
+                return None
+            left -= t
+            # Put the ball exactly on the obstacle, so that rounding never leaves it on the other side.
+            if axis == 'x':
+                self.x, self.y = plane, self.y + self.dy * t
+                self.dx = -self.dx
+            elif axis == 'y':
+                self.x, self.y = self.x + self.dx * t, plane
+                self.dy = -self.dy
+            else:
+                player = 1 if plane > 0 else 2
+                self.scores[player - 1] += 1
+                self.serve()
+                return player
+        return None
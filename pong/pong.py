@@ -5,9 +5,15 @@ Object oriented reimplementation of the one found here.
 http://christianthompson.com/sites/default/files/Pong/pong.py
 It adds a game-ending condition.
 """
+import contextlib
+import socket
 import turtle
 import time
 
+from ai import Computer, PADDLE_SPEED
+from net import Client
+from physics import PongState, DT
+
 
 class Shape:
     """ Base class for shapes """
@@ -31,97 +37,67 @@ class Paddle(Shape):
     """
     The paddle. It doesn't do anything other than moving up and down.
     """
-    def __init__(self, *pos):
+    def __init__(self, state, player, x):
+        """
+        :param state: physics.PongState with the position of the paddle.
+        :param player: 1 for the left paddle, 2 for the right one.
+        :param x: Position on the X-axis.
+        """
         super().__init__()
+        self.state = state
+        self.player = player
         self.sprite.shapesize(stretch_wid=5, stretch_len=1)
         self.sprite.penup()
-        self.sprite.goto(pos)
+        self.sprite.goto(x, state.paddles[player - 1])
 
     def move(self, ycoord=0):
         """
         Updates the position of the paddle by adding the value of ycoord.
         :param ycoord: Int. Add this to the Y-axis position. Negative values make the paddle go down.
         """
-        self.sprite.sety(self.sprite.ycor() + ycoord)
-        if  self.sprite.ycor() < -250:
-            self.sprite.sety(-250)
-        if self.sprite.ycor() > 250:
-            self.sprite.sety(250)
+        self.state.move_paddle(self.player, ycoord)
+        self.draw()
+
+    def draw(self):
+        self.sprite.sety(self.state.paddles[self.player - 1])
 
 
 class Ball(Shape):
     """
-    The ball. It moves in both axes simultaneously and bounces when it encounters an obstacle.
+    The ball. Where it goes is up to physics.PongState, this only draws it.
     """
-    def __init__(self):
+    def __init__(self, state):
         super().__init__()
+        self.state = state
         self.sprite.goto(0, 0)
-        self.dx = 1  # Acceleration on x
-        self.dy = 1  # Acceleration on y
 
-    def bounce(self, axis):
+    def draw(self, alpha=1):
         """
-        Bounces on the specified axis, which is just inverting the acceleration.
-        :param axis: String with either an x or a y.
+        Puts the ball between its last two positions, so it moves smoothly whatever the refresh rate.
+        :param alpha: Fraction of the physics step that has gone by since the last one.
         """
-        assert axis in ('x', 'y'), 'Only "x" and "y" are valid values.'
-        direction = {'x': 'dx', 'y': 'dy'}
-        print(f'boink {direction[axis]}')
-        setattr(self, direction[axis], getattr(self, direction[axis]) * -1)
-
-    def move(self, paddle_a, paddle_b, score):
-        """
-        Updates the position of the ball on the screen. Adds the acceleration values to the position.
-        :param paddle_a: Paddle object that represents the first player. Needed for collisions.
-        :param paddle_b: Paddle for the second player.
-        :param score: Score. It will be updated when a player scores.
-        """
-        self.sprite.setx(self.xcor + self.dx)
-        self.sprite.sety(self.ycor + ball.dy)
-        # Bounce on floor and ceiling.
-        if self.ycor > 290 or self.ycor < -290:
-            # self.sprite.sety(290)
-            self.bounce('y')
-        # Score
-        if self.xcor > 350:
-            score.player1 += 1
-            self.sprite.goto(0,0)
-            self.bounce('x')
-            score.update()
-            print('Player 1 scores ^^')
-        elif self.xcor < -350:
-            score.player2 +=1
-            self.sprite.goto(0,0)
-            self.bounce('x')
-            score.update()
-            print('Player 2 scores ^^')
-        # Detect paddle collision
-        if self.xcor < -340 and self.ycor < paddle_a.ycor + 50 and self.ycor > paddle_a.ycor -50:
-            self.bounce('x')
-        elif self.xcor > 340 and self.ycor < paddle_b.ycor + 50 and self.ycor > paddle_b.ycor - 50:
-            self.bounce('x')
+        self.sprite.goto(self.state.position(alpha))
 
 
 class Score:
     """
     A scoreboard on top of the screen.
     """
-    def __init__(self):
+    def __init__(self, state):
+        self.state = state
         self.sprite = turtle.Turtle()
         self.sprite.speed(0)
         self.sprite.color('white')
         self.sprite.penup()
         self.sprite.hideturtle()
         self.sprite.goto(0, 260)
-        self.player1 = 0
-        self.player2 = 0
 
     def __repr__(self):
-        return f'{self.player1}:{self.player2}'
+        return '{}:{}'.format(*self.state.scores)
 
     @property
     def winner(self):
-        return '1' if self.player1 > self.player2 else '2'
+        return str(self.state.winner)
 
     def update(self):
         """
@@ -131,38 +107,200 @@ class Score:
         self.sprite.write(str(self), align='center', font=('Courier', 24, 'normal'))
 
 
-if __name__ == '__main__':
+def screen():
+    """ The window, with turtle's animations off: it is only redrawn on update. """
     window = turtle.Screen()
     window.title('Pong')
     window.bgcolor('black')
     window.setup(width=800, height=600)
     window.tracer(0)
+    return window
+
 
-    paddle_a = Paddle(-350, 0)
-    paddle_b = Paddle(350, 0)
-    ball = Ball()
-    score = Score()
+def announce(window, text):
+    """
+    Writes a message in the middle of the screen.
+    :returns: The turtle that wrote it, to clear it.
+    """
+    message = turtle.Turtle()
+    message.speed(0)
+    message.color('yellow')
+    message.penup()
+    message.hideturtle()
+    message.goto(0, 130)
+    message.write(text, align='center', font=('Courier', 24, 'normal'))
+    window.update()
+    return message
+
+
+def main(fps=60, computer=None, profiler=None):
+    """
+    Game loop. The physics move forward by fixed steps of physics.DT, as many as fit in the time that went by, and the
+    screen is redrawn at most fps times per second, with the ball drawn between its last two positions.
+    :param fps: Maximum redraws per second.
+    :param computer: ai.Computer that plays the right paddle. Two players share the keyboard if None.
+    :param profiler: frameprof.FrameProfiler that times every frame and shows it on the screen. Tk handles the key
+                     presses while it redraws the window, so they are timed with the redraw (flip).
+    """
+    window = screen()
+    state = PongState()
+    paddle_a = Paddle(state, 1, -350)
+    paddle_b = Paddle(state, 2, 350)
+    ball = Ball(state)
+    score = Score(state)
 
     # Key bindings (onkeypress only accepts lambdas)
     window.listen()
     window.onkeypress(lambda: paddle_a.move(20), 'w')
     window.onkeypress(lambda: paddle_a.move(-20), 's')
-    window.onkeypress(lambda: paddle_b.move(20), 'Up')
-    window.onkeypress(lambda: paddle_b.move(-20), 'Down')
+    if computer is None:
+        window.onkeypress(lambda: paddle_b.move(20), 'Up')
+        window.onkeypress(lambda: paddle_b.move(-20), 'Down')
 
     score.update()
+    phase = profiler.phase if profiler else contextlib.nullcontext
+    if profiler:
+        hud = turtle.Turtle()
+        hud.hideturtle()
+        hud.color('gray')
+        hud.penup()
+        hud.goto(-390, 200)
 
-    while max(score.player1, score.player2) < 10:
-        ball.move(paddle_a, paddle_b, score)  # Ball must be aware of the paddles' position and the score.
-        time.sleep(0.005)  # Without a delay it goes as fas as the CPU --> unplayable.
-        window.update()
+    frame = 1 / fps
+    accumulator = 0
+    previous = time.perf_counter()
+    while not state.over:
+        now = time.perf_counter()
+        if profiler:
+            profiler.frame()
+        # After a long hiccup (e.g. the window was dragged), don't try to catch up all at once.
+        accumulator += min(now - previous, 0.25)
+        previous = now
+        with phase('update'):
+            while accumulator >= DT:
+                accumulator -= DT
+                if computer is not None:
+                    state.move_paddle(2, computer(state, DT))
+                scorer = state.step(DT)
+                if scorer:
+                    score.update()
+                    print(f'Player {scorer} scores ^^')
+        with phase('draw'):
+            ball.draw(accumulator / DT)
+            if computer is not None:
+                paddle_b.draw()
+        if profiler:
+            with phase('hud'):
+                profiler.write(hud)
+        with phase('flip'):
+            window.update()
+        time.sleep(max(0, now + frame - time.perf_counter()))  # Without a delay it goes as fast as the CPU.
     else:
-        message = turtle.Turtle()
-        message.speed(0)
-        message.color('yellow')
-        message.penup()
-        message.hideturtle()
-        message.goto(0, 130)
-        message.write(f'Player {score.winner} wins!', align='center', font=('Courier', 24, 'normal'))
+        announce(window, f'Player {score.winner} wins!')
+    if profiler:
+        profiler.close()
+
+    time.sleep(5)
+
+
+def online(address, fps=60):
+    """
+    Plays a match on a server (see net.py). The paddle moves as soon as a key is pressed, and the rest of the game is
+    drawn as the server sends it, with the ball drawn between the last two positions received.
+    :param address: 'host:port' of the server.
+    :param fps: Maximum redraws per second.
+    """
+    host, port = address.rsplit(':', 1)
+    connection = socket.create_connection((host, int(port)))
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    connection.setblocking(False)
+    client = Client()
+    window = screen()
+    waiting = announce(window, 'Waiting for a rival...')
+    while client.player is None:
+        try:
+            data = connection.recv(1 << 12)
+            if not data:
+                break
+            client.feed(data)
+        except BlockingIOError:
+            pass
+        except ConnectionError:
+            break
+        window.update()
+        time.sleep(0.1)
+    waiting.clear()
+    if client.player is None:
+        connection.close()
+        announce(window, 'The server closed the connection')
+        time.sleep(5)
+        return
+    state = client.state
+    paddles = [Paddle(state, 1, -350), Paddle(state, 2, 350)]
+    ball = Ball(state)
+    score = Score(state)
+    score.update()
+    scores = state.scores
+    outgoing = bytearray()  # Moves not sent yet. They are sent whole and in order, or the server would misread them.
 
+    def move(dy):
+        outgoing.extend(client.move(dy))
+        paddles[client.player - 1].draw()
+
+    # Either set of keys moves the player's paddle, whichever side it is on.
+    window.listen()
+    for key, dy in (('w', 20), ('s', -20), ('Up', 20), ('Down', -20)):
+        window.onkeypress(lambda dy=dy: move(dy), key)
+
+    frame = 1 / fps
+    received = time.perf_counter()
+    while not state.over:
+        now = time.perf_counter()
+        if outgoing:
+            try:
+                del outgoing[:connection.send(outgoing)]
+            except BlockingIOError:
+                pass
+            except ConnectionError:
+                break
+        try:
+            data = connection.recv(1 << 12)
+            if not data:
+                break  # The server closed the match: the rival left.
+            if client.feed(data):
+                received = now
+        except BlockingIOError:
+            pass
+        except ConnectionError:  # The server closed the match while a move was on its way.
+            break
+        ball.draw(min(1, (now - received) / DT))
+        for paddle in paddles:
+            paddle.draw()
+        if state.scores != scores:
+            scores = state.scores
+            score.update()
+        window.update()
+        time.sleep(max(0, now + frame - time.perf_counter()))
+    connection.close()
+    announce(window, 'You win!' if state.over and state.winner == client.player else 'Game over')
     time.sleep(5)
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    import frameprof
+    parser = argparse.ArgumentParser(description="Two-player pong.")
+    parser.add_argument('--fps', type=int, default=60, help="Maximum redraws per second.")
+    parser.add_argument('--ai', type=float, nargs='?', const=PADDLE_SPEED, metavar='SPEED',
+                        help="Play against the computer, which moves the right paddle at SPEED pixels per second.")
+    parser.add_argument('--connect', metavar='HOST:PORT', help="Play online, on a server started with net.py.")
+    frameprof.add_arguments(parser)
+    args = parser.parse_args()
+    if args.connect:
+        online(args.connect, args.fps)
+    else:
+        main(args.fps, None if args.ai is None else Computer(2, args.ai),
+             frameprof.from_arguments(args, ('update', 'draw', 'flip', 'hud')))
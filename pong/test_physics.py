@@ -0,0 +1,50 @@
+"""
+Checks of the pong rules, without a window:
+
+    python -m pytest test_physics.py
+"""
+import copy
+import random
+
+from physics import PongState, WALL, PADDLE_X, PADDLE_LIMIT
+
+
+def random_state(rng, speed=2000):
+    """ State with the paddles anywhere and the ball flying in any direction, somewhere between the paddles. """
+    state = PongState()
+    state.paddles = [rng.uniform(-PADDLE_LIMIT, PADDLE_LIMIT), rng.uniform(-PADDLE_LIMIT, PADDLE_LIMIT)]
+    state.x = rng.uniform(-PADDLE_X, PADDLE_X)
+    state.y = rng.uniform(-WALL, WALL)
+    state.dx = rng.choice([-1, 1]) * rng.uniform(100, speed)
+    state.dy = rng.uniform(-speed, speed)
+    return state
+
+
+def test_step_size():
+    """ One step of 0.1 s ends where 1000 steps of 0.1 ms do, bounces included, up to the first goal. """
+    rng = random.Random(0)
+    bounced = 0
+    for _ in range(300):
+        big = random_state(rng)
+        small = copy.deepcopy(big)
+        direction = (big.dx, big.dy)
+        if big.step(0.1) is not None:
+            continue  # A serve drops the rest of the step, so the two can't match after a goal.
+        assert not any(small.step(1e-4) for _ in range(1000))
+        assert abs(big.x - small.x) < 1e-6 and abs(big.y - small.y) < 1e-6
+        assert (big.dx, big.dy) == (small.dx, small.dy)
+        bounced += (big.dx, big.dy) != direction
+    assert bounced > 50  # Most of them hit something, or this checks nothing.
+
+
+def test_stays_inside():
+    """ However long the steps, the ball never leaves the field and never ends inside a paddle. """
+    rng = random.Random(1)
+    for _ in range(100):
+        state = random_state(rng, speed=20000)
+        for _ in range(100):
+            state.step(rng.uniform(0, 0.5))
+            assert abs(state.y) <= WALL
+            for player in (1, 2):
+                left, bottom, right, top = state.paddle_box(player)
+                assert not (left < state.x < right and bottom < state.y < top)
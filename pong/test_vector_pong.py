@@ -0,0 +1,36 @@
+"""
+Checks that the vectorized matches follow the same rules as physics.PongState:
+
+    python -m pytest test_vector_pong.py
+"""
+import numpy
+
+from physics import PongState
+from vector_pong import VectorPong
+
+
+def test_same_as_pong_state():
+    """ Matches stepped together end with the same scores, ball and paddles as PongState stepping them one by one. """
+    matches = 200
+    pong = VectorPong(matches, speed=600, points=10 ** 6, seed=0)  # No match ends, so none is reset at random.
+    states = []
+    for i in range(matches):
+        state = PongState()
+        state.x, state.y, state.dx, state.dy = map(float, (pong.x[i], pong.y[i], pong.dx[i], pong.dy[i]))
+        states.append(state)
+    rng = numpy.random.default_rng(0)
+    for _ in range(2000):
+        dt = rng.choice([1 / 120, 1 / 60, 1 / 30, 0.1])
+        # Follow the ball, badly, so that there are rallies and goals.
+        moves = numpy.clip(pong.y[:, None] - pong.paddles + rng.uniform(-80, 80, (matches, 2)), -20, 20)
+        scored = pong.step(moves, dt)
+        for i, state in enumerate(states):
+            state.move_paddle(1, moves[i, 0])
+            state.move_paddle(2, moves[i, 1])
+            assert (state.step(dt) or 0) == scored[i]
+    for i, state in enumerate(states):
+        assert state.scores == list(pong.scores[i])
+        assert state.paddles == list(pong.paddles[i])
+        assert abs(state.x - pong.x[i]) < 1e-6 and abs(state.y - pong.y[i]) < 1e-6
+        assert (state.dx, state.dy) == (pong.dx[i], pong.dy[i])
+    assert pong.scores.sum() > matches and pong.returns.sum() > matches
@@ -0,0 +1,197 @@
+"""
+Thousands of pong matches stepped at once with numpy.
+
+Follows the rules of physics.PongState (swept collisions against the walls, the goal lines and the paddle boxes), with
+every match's state kept in arrays indexed by match. Every step runs the collision loop for all the matches together:
+on each round, each match finds its first obstacle and the ones that reach it bounce, until none has time left. Balls
+that stay in the open field for the whole step skip the loop.
+"""
+import numpy
+
+from physics import DT, SPEED, WALL, GOAL, PADDLE_X, PADDLE_REACH, PADDLE_WIDTH, PADDLE_LIMIT, POINTS, MAX_BOUNCES
+
+
+def slab(p, v, low, high):
+    """
+    Same as physics.slab, for arrays.
+    :returns: Tuple of arrays with the times the points get in and out and the values they get in through.
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        t1 = (low - p) / v
+        t2 = (high - p) / v
+    t_in = numpy.minimum(t1, t2)
+    t_out = numpy.maximum(t1, t2)
+    still = v == 0
+    inside = (low < p) & (p < high)
+    t_in[still] = numpy.where(inside[still], -numpy.inf, numpy.inf)
+    t_out[still] = numpy.where(inside[still], numpy.inf, -numpy.inf)
+    return t_in, t_out, numpy.where(v > 0, low, high)
+
+
+def sweep(x, y, dx, dy, left, bottom, right, top):
+    """
+    Same as physics.sweep, for arrays.
+    :returns: Tuple of arrays with the times (infinite when there is no hit), whether the side is on the X-axis and
+              the position of the side.
+    """
+    x_in, x_out, x_plane = slab(x, dx, left, right)
+    y_in, y_out, y_plane = slab(y, dy, bottom, top)
+    t_in = numpy.maximum(x_in, y_in)
+    hit = (t_in >= 0) & (t_in < numpy.minimum(x_out, y_out))
+    on_x = x_in >= y_in
+    return numpy.where(hit, t_in, numpy.inf), on_x, numpy.where(on_x, x_plane, y_plane)
+
+
+class VectorPong:
+    """ A batch of pong matches. """
+    def __init__(self, matches, speed=SPEED, points=POINTS, seed=None):
+        """
+        :param matches: Number of matches.
+        :param speed: Ball speed on the X-axis, in pixels per second. Serves go at a random angle of up to 45 degrees.
+        :param points: Points to win a match. Finished matches start over on their own.
+        :param seed: Seed of the random generator for the serves.
+        """
+        self.matches = matches
+        self.speed = speed
+        self.points = points
+        self.random = numpy.random.default_rng(seed)
+        self.index = numpy.arange(matches)
+        self.x = numpy.zeros(matches)
+        self.y = numpy.zeros(matches)
+        self.dx = numpy.zeros(matches)
+        self.dy = numpy.zeros(matches)
+        self.paddles = numpy.zeros((matches, 2))
+        self.scores = numpy.zeros((matches, 2), dtype=numpy.int64)
+        self.returns = numpy.zeros((matches, 2), dtype=numpy.int64)  # Times each player hit the ball, ever.
+        self.rally = numpy.zeros(matches, dtype=numpy.int64)  # Hits since the last serve.
+        self.reset()
+
+    def reset(self, matches=None):
+        """
+        Starts matches over, with the paddles in the middle and a random serve.
+        :param matches: Integer array with the matches to reset. All of them by default.
+        """
+        if matches is None:
+            matches = self.index
+        self.paddles[matches] = 0
+        self.scores[matches] = 0
+        self.x[matches] = self.y[matches] = 0
+        self.dx[matches] = self.speed * self.random.choice([-1, 1], len(matches))
+        self.dy[matches] = self.speed * self.random.uniform(-1, 1, len(matches))
+        self.rally[matches] = 0
+
+    def move_paddles(self, moves):
+        """
+        Moves the paddles up or down, without leaving the screen.
+        :param moves: Array of shape (matches, 2) with what to add to the position of each paddle.
+        """
+        numpy.clip(self.paddles + moves, -PADDLE_LIMIT, PADDLE_LIMIT, out=self.paddles)
+
+    def hits(self, x, y, dx, dy, paddles):
+        """
+        Same as PongState.hits, for the matches given by the arrays.
+        :returns: Tuple of arrays of shape (4, n) with the times to get to the paddle of each player, the wall and the
+                  goal line, whether the ball bounces on the X-axis, and the position of the obstacle.
+        """
+        times = numpy.empty((4, len(x)))
+        on_x = numpy.empty((4, len(x)), dtype=bool)
+        planes = numpy.empty((4, len(x)))
+        for player, left in ((0, -PADDLE_X - PADDLE_WIDTH), (1, PADDLE_X)):
+            times[player], on_x[player], planes[player] = sweep(
+                x, y, dx, dy, left, paddles[:, player] - PADDLE_REACH, left + PADDLE_WIDTH,
+                paddles[:, player] + PADDLE_REACH)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            planes[2] = numpy.where(dy > 0, WALL, -WALL)
+            times[2] = numpy.where(dy == 0, numpy.inf, numpy.maximum(0, (planes[2] - y) / dy))
+            planes[3] = numpy.where(dx > 0, GOAL, -GOAL)
+            times[3] = numpy.where(dx == 0, numpy.inf, numpy.maximum(0, (planes[3] - x) / dx))
+        on_x[2] = False
+        on_x[3] = True
+        return times, on_x, planes
+
+    def step(self, moves=None, dt=DT):
+        """
+        Moves the paddles, then the balls.
+        :param moves: Array of shape (matches, 2) with what to add to the position of each paddle, or None.
+        :param dt: Seconds to move forward.
+        :returns: Integer array with the player who scored on this step in each match (1 or 2), 0 if nobody did.
+                  Matches that finish are already reset.
+        """
+        if moves is not None:
+            self.move_paddles(moves)
+        scored = numpy.zeros(self.matches, dtype=numpy.int64)
+        # Most balls start and end the step in the open field, between the walls and the paddles' sides. The field is
+        # a box, so they go straight all the way without any obstacle to look for.
+        x = self.x + self.dx * dt
+        y = self.y + self.dy * dt
+        clear = ((numpy.abs(self.x) < PADDLE_X) & (numpy.abs(x) < PADDLE_X) &
+                 (numpy.abs(self.y) < WALL) & (numpy.abs(y) < WALL))
+        self.x[clear] = x[clear]
+        self.y[clear] = y[clear]
+        active = self.index[~clear]
+        left = numpy.full(self.matches, dt)
+        for _ in range(MAX_BOUNCES):
+            x, y, dx, dy = self.x[active], self.y[active], self.dx[active], self.dy[active]
+            times, on_x, planes = self.hits(x, y, dx, dy, self.paddles[active])
+            first = numpy.argmin(times, axis=0)
+            columns = numpy.arange(len(active))
+            t = times[first, columns]
+            # The ones that don't get to an obstacle go all the way and are done.
+            free = t > left[active]
+            done = active[free]
+            self.x[done] += self.dx[done] * left[done]
+            self.y[done] += self.dy[done] * left[done]
+            hit = ~free
+            active, t, first = active[hit], t[hit], first[hit]
+            on_x, plane = on_x[first, columns[hit]], planes[first, columns[hit]]
+            if len(active) == 0:
+                break
+            left[active] -= t
+            # Move onto the obstacle, then bounce or score.
+            self.x[active] = numpy.where(on_x, plane, self.x[active] + self.dx[active] * t)
+            self.y[active] = numpy.where(on_x, self.y[active] + self.dy[active] * t, plane)
+            bounce = first < 3
+            self.dx[active[bounce & on_x]] *= -1
+            self.dy[active[bounce & ~on_x]] *= -1
+            paddle = first < 2
+            numpy.add.at(self.returns, (active[paddle], first[paddle]), 1)
+            self.rally[active[paddle]] += 1
+            goal = active[~bounce]
+            player = numpy.where(self.x[goal] > 0, 1, 2)
+            scored[goal] = player
+            self.scores[goal, player - 1] += 1
+            self.serve(goal)
+            active = active[bounce]
+        over = self.index[self.scores.max(axis=1) >= self.points]
+        if len(over):
+            self.reset(over)
+        return scored
+
+    def serve(self, matches):
+        """ Same as PongState.serve. """
+        self.x[matches] = self.y[matches] = 0
+        self.dx[matches] *= -1
+        self.rally[matches] = 0
+
+
+def benchmark(matches=4096, steps=1000, seed=0):
+    """
+    Steps matches with randomly moving paddles and prints the steps per second.
+    """
+    import time
+    pong = VectorPong(matches, seed=seed)
+    rng = numpy.random.default_rng(seed)
+    start = time.perf_counter()
+    for _ in range(steps):
+        pong.step(rng.uniform(-10, 10, (matches, 2)))
+    elapsed = time.perf_counter() - start
+    print(f'{matches} matches: {matches * steps / elapsed:.0f} steps/s')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Measures the steps per second of the vectorized pong matches.")
+    parser.add_argument('-n', '--matches', type=int, default=4096, help="Number of matches.")
+    parser.add_argument('-s', '--steps', type=int, default=1000, help="Number of steps.")
+    args = parser.parse_args()
+    benchmark(args.matches, args.steps)
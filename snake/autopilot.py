@@ -0,0 +1,98 @@
+"""
+Autopilot for the snake: steers toward the snack with an A* search on the wrapping grid.
+
+The search knows when every body cell will be free again (the tail leaves one cell per step), so the path it
+finds is safe to follow until the end without checking again. The path is kept between ticks and only searched
+again when the snack moves or the path runs out, so most ticks cost a dictionary lookup.
+When the snack can't be reached, it follows its own tail, which always stays reachable, until the way opens up.
+"""
+import heapq
+from collections import deque
+
+
+class Autopilot:
+    """ Callable that takes a core.SnakeState and returns the direction to take. """
+    def __init__(self, rows):
+        self.rows = rows
+        self.path = deque()  # Cells to visit, next one first.
+        self.snack = None  # Where the snack was when the path was planned.
+        self.entered = {}  # Tick when the head entered each body cell.
+        self.tick = None
+
+    def track(self, state):
+        """
+        Keeps the tick when the head entered each cell of the body, to know when the tail will leave it.
+        It is updated with the new head and the vacated cell on every tick; if a tick was missed, it is rebuilt.
+        """
+        if self.tick is not None and state.ticks == self.tick + 1:
+            if state.vacated is not None:
+                self.entered.pop(state.vacated, None)
+            self.entered[state.head] = state.ticks
+        else:
+            self.entered = {pos: state.ticks - i for i, pos in enumerate(state.body)}
+            self.path.clear()
+        self.tick = state.ticks
+
+    def free_at(self, state, pos, steps):
+        """ Tells if a cell can be entered in a number of steps from now. """
+        entered = self.entered.get(pos)
+        if entered is None:
+            return True
+        # The body cell index i (0 is the head) is left behind by the tail in len(body) - i steps.
+        return len(state.body) - (state.ticks - entered) <= steps
+
+    def distance(self, a, b):
+        """ Length of the shortest path between two cells on the wrapping grid, ignoring the body. """
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return min(dx, self.rows - dx) + min(dy, self.rows - dy)
+
+    def search(self, state, goal):
+        """
+        A* search from the head to a cell. The distance ignoring the body never overestimates, so the path is as short
+        as a breadth-first search's, but on a mostly empty grid only the cells near the straight way get looked at.
+        :returns: Deque with the path (without the head), or None if the goal can't be reached.
+        """
+        rows = self.rows
+        start = state.head
+        parents = {start: None}
+        steps = {start: 0}
+        # Ties are broken toward the cells farther from the start, which are the closest to the goal.
+        heap = [(self.distance(start, goal), 0, start)]
+        while heap:
+            _, negative_steps, pos = heapq.heappop(heap)
+            if pos == goal:
+                path = deque()
+                while pos != start:
+                    path.appendleft(pos)
+                    pos = parents[pos]
+                return path
+            arrival = 1 - negative_steps
+            x, y = pos
+            for cell in (((x - 1) % rows, y), ((x + 1) % rows, y), (x, (y - 1) % rows), (x, (y + 1) % rows)):
+                if cell in steps or not self.free_at(state, cell, arrival):
+                    continue
+                steps[cell] = arrival
+                parents[cell] = pos
+                heapq.heappush(heap, (arrival + self.distance(cell, goal), -arrival, cell))
+        return None
+
+    def __call__(self, state):
+        self.track(state)
+        if self.path and (self.snack != state.snack or not self.free_at(state, self.path[0], 1)):
+            self.path.clear()
+        if not self.path:
+            self.snack = state.snack
+            path = self.search(state, state.snack)
+            if path is None and len(state.body) > 1:
+                # Chase the tail: its cell is free as soon as the head gets there. Once there, try the snack again.
+                path = self.search(state, state.body[-1])
+            self.path = path or deque()
+        if not self.path:
+            return None  # Trapped: nothing to do.
+        x, y = state.head
+        nx, ny = self.path.popleft()
+        # Turn the next cell into a direction, minding the wrap-around.
+        dx = (nx - x + 1) % self.rows - 1
+        dy = (ny - y + 1) % self.rows - 1
+        return dx, dy
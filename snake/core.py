@@ -0,0 +1,192 @@
+"""
+Rules of the snake game, without pygame.
+The whole game state lives in SnakeState, which owns its random generator, so a game can be simulated (and replayed)
+as fast as the CPU allows and without opening a window.
+"""
+import copy
+import random
+from collections import deque
+
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+UP = (0, -1)
+DOWN = (0, 1)
+
+
+class SpatialIndex:
+    """
+    Cells grouped in square chunks, to find the ones inside an area without looking at every cell of the area or
+    every cell in the index. Only chunks with cells are stored, so memory grows with the number of cells.
+    """
+    def __init__(self, rows, chunk=16):
+        """
+        :param rows: Number of rows (and columns) of the grid, which wraps around.
+        :param chunk: Side of the chunks, in cells.
+        """
+        self.rows = rows
+        self.chunk = chunk
+        self.chunks = {}
+
+    def add(self, pos):
+        key = (pos[0] // self.chunk, pos[1] // self.chunk)
+        self.chunks.setdefault(key, set()).add(pos)
+
+    def remove(self, pos):
+        key = (pos[0] // self.chunk, pos[1] // self.chunk)
+        cells = self.chunks[key]
+        cells.discard(pos)
+        if not cells:
+            del self.chunks[key]
+
+    def span(self, start, length):
+        """
+        Chunks on one axis with cells between start and start + length, which can wrap around the grid.
+        :returns: Range or set of chunk indices.
+        """
+        if length >= self.rows:
+            return range((self.rows - 1) // self.chunk + 1)
+        start %= self.rows
+        end = start + length
+        chunks = set(range(start // self.chunk, (min(end, self.rows) - 1) // self.chunk + 1))
+        if end > self.rows:  # Wraps around: the rest is at the start of the grid.
+            chunks.update(range((end - self.rows - 1) // self.chunk + 1))
+        return chunks
+
+    def query(self, left, top, width, height):
+        """
+        Cells inside an area of the grid. The area can go over the edges, and it wraps around like the grid.
+        :returns: List of tuples with the position of every cell relative to the top-left corner of the area.
+        """
+        found = []
+        for cx in self.span(left, width):
+            for cy in self.span(top, height):
+                for x, y in self.chunks.get((cx, cy), ()):
+                    dx = (x - left) % self.rows
+                    dy = (y - top) % self.rows
+                    if dx < width and dy < height:
+                        found.append((dx, dy))
+        return found
+
+
+class SnakeState:
+    """
+    The snake's body, its direction and the snack on a square grid whose edges wrap around.
+    The body is a deque of grid positions (x, y), head first, so moving is pushing the new head and popping the tail.
+    The same positions are kept in a set, so checking if a cell is taken doesn't depend on the length of the snake.
+    The free cells are kept in a list, with a map from every free cell to its index in the list, so that a cell can be
+    taken or given back in constant time (swapping it with the last one) and a random free cell is one list lookup.
+    """
+    def __init__(self, rows, seed=None, start=None, sparse=False):
+        """
+        :param rows: Number of rows (and columns) of the grid.
+        :param seed: Seed of the random generator that places the snacks.
+        :param start: Position where the snake starts. The center of the grid by default.
+        :param sparse: For huge grids. Nothing is stored per free cell, so memory only grows with the snake: instead of
+                       the free-cell index, snacks are placed by trying random cells (almost all of them are free), and
+                       the body is kept in a SpatialIndex (the index attribute) to find the segments in view.
+        """
+        self.rows = rows
+        self.sparse = sparse
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.start = start or (rows // 2, rows // 2)
+        self.reset()
+
+    @property
+    def head(self):
+        return self.body[0]
+
+    @property
+    def score(self):
+        return len(self.body) - 1
+
+    def reset(self):
+        """ Back to a single-segment snake. The random generator keeps going, so every game gets different snacks. """
+        self.body = deque([self.start])
+        self.occupied = {self.start}
+        if self.sparse:
+            self.free = self.free_index = None
+            self.index = SpatialIndex(self.rows)
+            self.index.add(self.start)
+        else:
+            self.free = [(x, y) for y in range(self.rows) for x in range(self.rows) if (x, y) != self.start]
+            self.free_index = {pos: i for i, pos in enumerate(self.free)}
+        self.won = False
+        self.direction = DOWN
+        self.done = False
+        self.ticks = 0
+        self.vacated = None  # Cell left behind by the tail on the last step.
+        self.snack = self.random_cell()
+
+    def copy(self):
+        """ Independent copy of the whole state, random generator included. """
+        return copy.deepcopy(self)
+
+    def random_cell(self):
+        """
+        Picks a random free cell.
+        :returns: Position of a free cell, or None if the snake fills the whole grid.
+        """
+        if self.sparse:
+            if len(self.occupied) == self.rows * self.rows:
+                return None
+            while True:
+                pos = (self.random.randrange(self.rows), self.random.randrange(self.rows))
+                if pos not in self.occupied:
+                    return pos
+        if not self.free:
+            return None
+        return self.free[self.random.randrange(len(self.free))]
+
+    def take(self, pos):
+        """ Removes a cell from the free cells: the last free cell takes its place in the list. """
+        if self.sparse:
+            self.index.add(pos)
+            return
+        i = self.free_index.pop(pos)
+        last = self.free.pop()
+        if last != pos:
+            self.free[i] = last
+            self.free_index[last] = i
+
+    def give_back(self, pos):
+        """ Adds a cell to the free cells. """
+        if self.sparse:
+            self.index.remove(pos)
+            return
+        self.free_index[pos] = len(self.free)
+        self.free.append(pos)
+
+    def step(self, action=None):
+        """
+        Moves the snake one cell.
+        :param action: New direction, as a tuple (x, y), or None to keep going in the same direction.
+        :returns: Tuple with the state itself, the reward (1 for eating the snack, -1 for biting itself, 0 otherwise)
+                  and whether the game is over.
+        """
+        if action is not None:
+            self.direction = action
+        x, y = self.body[0]
+        head = ((x + self.direction[0]) % self.rows, (y + self.direction[1]) % self.rows)
+        self.ticks += 1
+        ate = head == self.snack
+        # The tail leaves its cell at the same time the head moves, so the head can take it.
+        if ate:
+            self.vacated = None
+        else:
+            self.vacated = self.body.pop()
+            self.occupied.discard(self.vacated)
+            self.give_back(self.vacated)
+        self.done = head in self.occupied
+        self.body.appendleft(head)
+        if self.done:
+            return self, -1, True
+        self.occupied.add(head)
+        self.take(head)
+        if ate:
+            self.snack = self.random_cell()
+            if self.snack is None:  # Nowhere to put a snack: the snake fills the grid.
+                self.won = self.done = True
+                return self, 1, True
+            return self, 1, False
+        return self, 0, False
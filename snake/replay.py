@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+"""
+Recording and playback of snake games.
+
+Since core.SnakeState owns its random generator, a session is fully given by the grid size, the seed and the
+direction changes with the tick they happened on. A replay file is:
+
+- A header: magic, version, flags, rows, seed, number of ticks, number of events and a CRC32 digest of the results
+  of every game in the session (see digest), so that playing the replay back checks that the rules still give the
+  same results.
+- The events, one varint each: the ticks since the previous event shifted left by two bits, ORed with the direction
+  (0: left, 1: right, 2: up, 3: down). Most events take a single byte.
+
+Ticks are counted over the whole session: when a game ends, the next one starts on the next tick, like in the game.
+
+    python replay.py game.rpl --speed 30        # Watch it.
+    python replay.py *.rpl --check              # Play them all headless and check the results.
+"""
+import struct
+import zlib
+
+from core import SnakeState, LEFT, RIGHT, UP, DOWN
+
+HEADER = struct.Struct('<4sBBIQIII')  # Magic, version, flags, rows, seed, ticks, events, digest.
+MAGIC = b'SNKR'
+VERSION = 1
+SPARSE = 1
+SEEDS = range(2 ** 64)  # Seeds that fit in the header.
+DIRECTIONS = [LEFT, RIGHT, UP, DOWN]
+CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+
+
+def digest(scores, state):
+    """ CRC32 of the scores of the finished games and the state the session ended with. """
+    data = struct.pack(f'<{len(scores)}I', *scores) + struct.pack('<IIIII', state.score, *state.head, *(state.snack or (0, 0)))
+    return zlib.crc32(data)
+
+
+class Recorder:
+    """ Plays a session through SnakeState.step, keeping the direction changes. """
+    def __init__(self, state):
+        """
+        :param state: Fresh core.SnakeState, created with an integer seed that fits in the header (see SEEDS).
+        """
+        if not isinstance(state.seed, int) or state.seed not in SEEDS:
+            raise ValueError(f'Replays need an integer seed from 0 to {SEEDS.stop - 1}, not {state.seed!r}.')
+        self.state = state
+        self.rows = state.rows
+        self.seed = state.seed
+        self.sparse = state.sparse
+        self.tick = 0
+        self.events = []
+        self.scores = []
+
+    def step(self, action=None):
+        """
+        Same as SnakeState.step. Finished games have to be reset right after, as the game does, and before saving.
+        """
+        self.tick += 1
+        if action is not None and action != self.state.direction:
+            self.events.append((self.tick, CODES[action]))
+        result = self.state.step(action)
+        if result[2]:
+            self.scores.append(self.state.score)
+        return result
+
+    def to_bytes(self):
+        data = bytearray(HEADER.pack(MAGIC, VERSION, SPARSE if self.sparse else 0, self.rows, self.seed, self.tick,
+                                     len(self.events), digest(self.scores, self.state)))
+        previous = 0
+        for tick, code in self.events:
+            value = (tick - previous) << 2 | code
+            previous = tick
+            while value >= 0x80:
+                data.append(value & 0x7f | 0x80)
+                value >>= 7
+            data.append(value)
+        return bytes(data)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+class Replay:
+    """
+    A recorded session. Keeps a copy of the state every keyframe_every ticks, so that seeking to any tick only needs
+    to play from the closest keyframe before it.
+    """
+    def __init__(self, data, keyframe_every=1000):
+        """
+        :param data: Bytes of a replay file.
+        :param keyframe_every: Ticks between keyframes.
+        """
+        magic, version, flags, self.rows, self.seed, self.ticks, count, self.digest = HEADER.unpack_from(data, 0)
+        assert magic == MAGIC and version == VERSION, 'Not a snake replay.'
+        self.sparse = bool(flags & SPARSE)
+        self.actions = {}
+        tick = 0
+        offset = HEADER.size
+        for _ in range(count):
+            value = shift = 0
+            while True:
+                byte = data[offset]
+                offset += 1
+                value |= (byte & 0x7f) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            tick += value >> 2
+            self.actions[tick] = DIRECTIONS[value & 3]
+        self.keyframe_every = keyframe_every
+        self.keyframes = {}
+        self.rewind()
+
+    @classmethod
+    def load(cls, path, keyframe_every=1000):
+        with open(path, 'rb') as f:
+            return cls(f.read(), keyframe_every)
+
+    def rewind(self):
+        self.state = SnakeState(self.rows, self.seed, sparse=self.sparse)
+        self.tick = 0
+        self.scores = []
+        self.keyframes[0] = (self.state.copy(), [])
+
+    def step(self):
+        """
+        Plays the next tick.
+        :returns: Whether a game ended on this tick. The state is reset right after, as the game does.
+        """
+        self.tick += 1
+        _, _, done = self.state.step(self.actions.get(self.tick))
+        if done:
+            self.scores.append(self.state.score)
+            self.state.reset()
+        if self.tick % self.keyframe_every == 0 and self.tick not in self.keyframes:
+            self.keyframes[self.tick] = (self.state.copy(), self.scores[:])
+        return done
+
+    def seek(self, tick):
+        """ Moves to a tick, starting from the closest keyframe seen so far. """
+        tick = max(0, min(tick, self.ticks))
+        keyframe = max(k for k in self.keyframes if k <= tick)
+        if not keyframe <= self.tick <= tick:
+            state, scores = self.keyframes[keyframe]
+            self.state, self.scores, self.tick = state.copy(), scores[:], keyframe
+        while self.tick < tick:
+            self.step()
+
+    def check(self):
+        """
+        Plays the whole session headless and compares the results with the ones recorded.
+        :returns: True if they match.
+        """
+        self.seek(0)
+        while self.tick < self.ticks:
+            self.step()
+        return digest(self.scores, self.state) == self.digest
+
+
+def watch(replay, speed=30, start=0):
+    """
+    Shows a replay in a window. Left and right arrows jump a keyframe back and forth, any other key quits.
+    :param speed: Ticks per second.
+    :param start: Tick to start from.
+    """
+    import pygame
+    from snake import Grid, Snake, Cube, Camera
+
+    if replay.sparse:
+        view = Camera(500)
+        window = view.window
+    else:
+        grid = Grid(500, replay.rows)
+        window = grid.window
+    pygame.init()
+    font = pygame.font.SysFont(pygame.font.get_default_font(), 30)
+    clock = pygame.time.Clock()
+    replay.seek(start)
+    while replay.tick < replay.ticks:
+        clock.tick(speed)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT:
+                    replay.seek(replay.tick - replay.keyframe_every)
+                elif event.key == pygame.K_RIGHT:
+                    replay.seek(replay.tick + replay.keyframe_every)
+                else:
+                    return
+        replay.step()
+        if replay.sparse:
+            view.draw(replay.state)
+        else:
+            grid.draw()
+            Snake(grid, (0, 255, 0), replay.state).draw()
+            Cube(grid, replay.state.snack, color=(255, 0, 0)).draw()
+        window.blit(font.render(f'Tick {replay.tick}/{replay.ticks}  Score: {replay.state.score}', False,
+                                (255, 255, 255)), (0, 0))
+        pygame.display.update()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Plays back recorded snake games.")
+    parser.add_argument('paths', nargs='+', help="Replay files.")
+    parser.add_argument('--check', action='store_true', help="Play headless as fast as possible and check the results.")
+    parser.add_argument('--speed', type=int, default=10, help="Ticks per second when watching.")
+    parser.add_argument('--start', type=int, default=0, help="Tick to start watching from.")
+    parser.add_argument('-k', '--keyframes', type=int, default=1000, help="Ticks between keyframes.")
+    args = parser.parse_args()
+    if args.check:
+        start = time.perf_counter()
+        failed = [path for path in args.paths if not Replay.load(path, args.keyframes).check()]
+        for path in failed:
+            print(f'{path}: results differ')
+        print(f'{len(args.paths) - len(failed)}/{len(args.paths)} replays match ({time.perf_counter() - start:.2f}s)')
+        raise SystemExit(1 if failed else 0)
+    for path in args.paths:
+        watch(Replay.load(path, args.keyframes), args.speed, args.start)
@@ -2,9 +2,19 @@
 """
 Snake game using pygame
 """
+import contextlib
 import random
+
 import pygame
 
+from autopilot import Autopilot
+from core import SnakeState, LEFT, RIGHT, UP, DOWN
+from replay import Recorder, SEEDS
+
+WIDTH = 500  # Side of the window, in pixels.
+CELL = 20  # Side of the cells in the camera's view, in pixels.
+KEYS = {pygame.K_LEFT: LEFT, pygame.K_RIGHT: RIGHT, pygame.K_UP: UP, pygame.K_DOWN: DOWN}
+
 
 class Grid:
     """ The board. As visual help, the lines are drawn."""
@@ -15,12 +25,28 @@ class Grid:
         self.window = pygame.display.set_mode((self.width, self.width))
         self.bgcolor = (0, 0, 0)
         self.linecolor = (50, 50, 50)
+        # The lines never change, so they are drawn once and copied to the window when needed.
+        self.background = pygame.Surface((self.width, self.width))
+        self.background.fill(self.bgcolor)
+        for l in range(0, self.width, self.size):
+            pygame.draw.line(self.background, self.linecolor, (l, 0), (l, self.width))
+            pygame.draw.line(self.background, self.linecolor, (0, l), (self.width, l))
 
     def draw(self):
-        self.window.fill(self.bgcolor)
-        for l in range(0, self.width, self.size):
-            pygame.draw.line(self.window, self.linecolor, (l, 0), (l, self.width))
-            pygame.draw.line(self.window, self.linecolor, (0, l), (self.width, l))
+        self.window.blit(self.background, (0, 0))
+
+    def cell_rect(self, pos):
+        """ Screen rectangle of a cell, lines included. """
+        return pygame.Rect(pos[0] * self.size, pos[1] * self.size, self.size + 1, self.size + 1)
+
+    def clear(self, rect):
+        """
+        Draws the empty grid over a part of the window.
+        :param rect: pygame.Rect of the area.
+        :returns: The same rectangle.
+        """
+        self.window.blit(self.background, rect, rect)
+        return rect
 
 
 class Cube:
@@ -35,107 +61,182 @@ class Cube:
         self.grid = grid
         self.side = self.grid.size
         self.pos = pos
-        self.direction = (1, 0)
         self.color = color
 
-    def move(self, direction):
+    def draw(self):
         """
-        Move to a new position on the grid and change the trajectory.
-        :param direction: Tuple with the direction (x, y)
+        Draws the cube in the correct grid cell.
+        :returns: Rectangle of the cell.
         """
-        self.direction = direction
-        self.pos = (self.pos[0] + self.direction[0], self.pos[1] + self.direction[1])
-
-    def draw(self):
-        """ Draws the cube in the correct grid cell. """
         pygame.draw.rect(self.grid.window, self.color,
                          (self.pos[0] * self.side + 1, self.pos[1] * self.side + 1, self.side - 2, self.side - 2))
+        return self.grid.cell_rect(self.pos)
 
 
 class Snake(object):
     """
-    A moving sequence of cubes.
-    To move over a grid, we need to store the position of the cubes and in which squares they turn and in which direction (what we call a trail).
-    The trail will map grid positions to directions and will be as long as the snake is.
-    When a the snake turns, a new entry is added. When the last body segment passes through an entry, the entry is removed.
+    Draws the snake of a game state. The rules of the game live in core.SnakeState.
     """
-    def __init__(self, grid, color, pos):
+    def __init__(self, grid, color, state):
         self.grid = grid
         self.color = color
-        self.head = Cube(self.grid, pos, color=self.color)
-        self.body = [self.head]
-        self.trail = {}
-        self.direction = (0, 1)
+        self.state = state
+
+    @property
+    def body(self):
+        return self.state.body
+
+    @property
+    def head(self):
+        return self.state.head
+
+    @property
+    def direction(self):
+        return self.state.direction
+
+    @direction.setter
+    def direction(self, value):
+        self.state.direction = value
 
     def move(self):
-        """ Slide the segments of the body through the trail. """
-        for segment in self.body:
-            p = segment.pos
-            if segment.pos in self.trail:
-                turn = self.trail[p]
-                segment.move((turn[0], turn[1]))
-                if segment == self.body[-1]:
-                    self.trail.pop(p)
-            else:
-                if segment.direction[0] == -1 and segment.pos[0] <= 0:
-                    segment.pos = (segment.grid.rows - 1, segment.pos[1])
-                elif segment.direction[0] == 1 and segment.pos[0] >= segment.grid.rows - 1:
-                    segment.pos = (0, segment.pos[1])
-                elif segment.direction[1] == 1 and segment.pos[1] >= segment.grid.rows - 1:
-                    segment.pos = (segment.pos[0], 0)
-                elif segment.direction[1] == -1 and segment.pos[1] <= 0:
-                    segment.pos = (segment.pos[0], segment.grid.rows - 1)
-                else:
-                    segment.move(segment.direction)
+        """ Moves the snake one cell. Returns the same as SnakeState.step. """
+        return self.state.step()
 
     def reset(self):
-        """ Reset snake's body and trail. """
-        self.body = [self.head]
-        self.trail = {}
-        self.direction = (0, 1)
-
-    def add_segment(self):
-        """ Add a new segment to the snake's body. """
-        tail = self.body[-1]
-        if tail.direction == (1, 0):
-            self.body.append(Cube(self.grid, (tail.pos[0] - 1, tail.pos[1]), color=self.color))
-        elif tail.direction == (-1, 0):
-            self.body.append(Cube(self.grid, (tail.pos[0] + 1, tail.pos[1]), color=self.color))
-        elif tail.direction == (0, 1):
-            self.body.append(Cube(self.grid, (tail.pos[0], tail.pos[1] - 1), color=self.color))
-        elif tail.direction == (0, -1):
-            self.body.append(Cube(self.grid, (tail.pos[0], tail.pos[1] + 1), color=self.color))
-        self.body[-1].direction = tail.direction
+        self.state.reset()
+
+    def draw_segment(self, pos):
+        """
+        Draws a body segment.
+        :returns: Rectangle of the cell.
+        """
+        side = self.grid.size
+        pygame.draw.rect(self.grid.window, self.color, (pos[0] * side + 1, pos[1] * side + 1, side - 2, side - 2))
+        return self.grid.cell_rect(pos)
+
+    def draw_head(self):
+        """ Draws the head, with the eyes. """
+        rect = self.draw_segment(self.head)
+        pos = self.head
+        side = self.grid.size
+        centre = side // 2
+        radius = 3
+        eye1 = (pos[0] * side + centre - radius, pos[1] * side + 8)
+        eye2 = (pos[0] * side + side - radius * 2, pos[1] * side + 8)
+        pygame.draw.circle(self.grid.window, (0, 0, 0), eye1, radius)
+        pygame.draw.circle(self.grid.window, (0, 0, 0), eye2, radius)
+        return rect
 
     def draw(self):
         """ Plots the snake on the grid. """
-        for segment in self.body:
-            segment.draw()
-            if segment == self.head:  # Draw eyes on the head.
-                centre = segment.side // 2
-                radius = 3
-                eye1 = (segment.pos[0] * segment.side + centre - radius, segment.pos[1] * segment.side + 8)
-                eye2 = (segment.pos[0] * segment.side + segment.side - radius * 2, segment.pos[1] * segment.side + 8)
-                pygame.draw.circle(self.grid.window, (0, 0, 0), eye1, radius)
-                pygame.draw.circle(self.grid.window, (0, 0, 0), eye2, radius)
-
-
-def random_cell(grid, snake):
+        for pos in self.body:
+            self.draw_segment(pos)
+        self.draw_head()
+
+    def draw_changes(self):
+        """
+        Draws what changed on the last step: the new head, the old head (which loses its eyes) and the cell the tail
+        left behind. It takes the same time no matter how long the snake is.
+        :returns: List of the rectangles that changed.
+        """
+        rects = []
+        vacated = self.state.vacated
+        if vacated is not None and vacated not in self.state.occupied:
+            rects.append(self.grid.clear(self.grid.cell_rect(vacated)))
+        if len(self.body) > 1:
+            rects.append(self.draw_segment(self.body[1]))
+        rects.append(self.draw_head())
+        return rects
+
+
+class Scoreboard:
     """
-    Generates a new random position on the space of free cells.
-    :param grid: The grid.
-    :param snake: The snake whose body will represent occupied cells.
-    :returns: Position of a free cell.
+    The score on the top-left corner. The text is only rendered again when the score changes.
     """
-    while True:
-        x = random.randrange(grid.rows)
-        y = random.randrange(grid.rows)
-        if len(list(filter(lambda z: z.pos == (x, y), snake.body))) > 0:
-            continue
+    def __init__(self, grid, font, color=(255, 255, 255)):
+        self.grid = grid
+        self.font = font
+        self.color = color
+        self.score = None
+        self.text = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+
+    def draw(self, state, snake, snack, rects=()):
+        """
+        Draws the score if it changed, or if something was drawn under it.
+        :param state: core.SnakeState.
+        :param snake: Snake, to draw again the segments under the old text.
+        :param snack: Cube with the snack.
+        :param rects: Rectangles drawn on this frame.
+        :returns: List of the rectangles that changed.
+        """
+        if state.score != self.score:
+            self.score = state.score
+            self.text = self.font.render('Score: {}'.format(self.score), False, self.color)
+            area = self.rect.union(self.text.get_rect())
+            self.grid.clear(area)
+            # Put back what the old text was covering.
+            size = self.grid.size
+            for x in range(area.left // size, area.right // size + 1):
+                for y in range(area.top // size, area.bottom // size + 1):
+                    if (x, y) in state.occupied:
+                        snake.draw_segment((x, y))
+                    elif (x, y) == snack.pos:
+                        snack.draw()
+            if area.collidepoint(*snake.grid.cell_rect(state.head).center):
+                snake.draw_head()
+        elif self.rect.collidelist(list(rects)) == -1:
+            return []
         else:
-            break
+            area = self.rect
+        self.rect = self.text.get_rect()
+        self.grid.window.blit(self.text, (0, 0))
+        return [area]
+
+
+class Camera:
+    """
+    A window over a grid too big to fit on the screen, following the snake's head. The cells keep their size, and
+    only the segments in view are drawn, found through the spatial index of a sparse core.SnakeState.
+    """
+    def __init__(self, width, size=CELL):
+        """
+        :param width: Side of the window, in pixels.
+        :param size: Side of the cells, in pixels.
+        """
+        self.width = width
+        self.size = size
+        self.cells = width // size  # Cells in view on each axis.
+        self.window = pygame.display.set_mode((self.width, self.width))
+        self.bgcolor = (0, 0, 0)
+        self.linecolor = (50, 50, 50)
+        self.background = pygame.Surface((self.width, self.width))
+        self.background.fill(self.bgcolor)
+        for l in range(0, self.width, self.size):
+            pygame.draw.line(self.background, self.linecolor, (l, 0), (l, self.width))
+            pygame.draw.line(self.background, self.linecolor, (0, l), (self.width, l))
 
-    return x, y
+    def draw(self, state, color=(0, 255, 0), snack_color=(255, 0, 0)):
+        """
+        Draws the part of the grid around the head.
+        :param state: Sparse core.SnakeState.
+        """
+        side = self.size
+        left = state.head[0] - self.cells // 2
+        top = state.head[1] - self.cells // 2
+        self.window.blit(self.background, (0, 0))
+        for x, y in state.index.query(left, top, self.cells, self.cells):
+            pygame.draw.rect(self.window, color, (x * side + 1, y * side + 1, side - 2, side - 2))
+        x = (state.snack[0] - left) % state.rows
+        y = (state.snack[1] - top) % state.rows
+        if x < self.cells and y < self.cells:
+            pygame.draw.rect(self.window, snack_color, (x * side + 1, y * side + 1, side - 2, side - 2))
+        # Draw eyes on the head, which is always in the middle.
+        x = y = self.cells // 2
+        centre = side // 2
+        radius = 3
+        pygame.draw.circle(self.window, (0, 0, 0), (x * side + centre - radius, y * side + 8), radius)
+        pygame.draw.circle(self.window, (0, 0, 0), (x * side + side - radius * 2, y * side + 8), radius)
 
 
 def pause():
@@ -148,57 +249,133 @@ def pause():
                 return
 
 
-def main():
-    width = 500
-    rows = 20
-    grid = Grid(width, rows)
-    snake = Snake(grid, (0, 255, 0), (10, 10))
-    snack = Cube(grid, random_cell(rows, snake), color=(255, 0, 0))
+def main(rows=20, seed=None, autopilot=False, fps=10, camera=False, record=None, profiler=None):
+    """
+    Game loop.
+    :param rows: Number of rows of the grid.
+    :param seed: Seed for the placement of the snacks.
+    :param autopilot: Let the computer play, starting over by itself after every game.
+    :param fps: Moves per second.
+    :param camera: Show only the cells around the snake's head, for grids too big to fit on the screen.
+    :param record: Path of a file where the session is recorded (see replay.py). It is saved after every game.
+    :param profiler: frameprof.FrameProfiler that times every frame and shows it on the screen.
+    """
+    width = WIDTH
+    if record and seed is None:
+        seed = random.randrange(2 ** 63)  # Replays need to know the seed.
+    if camera:
+        view = Camera(width)
+        window = view.window
+        state = SnakeState(rows, seed, sparse=True)
+    else:
+        grid = Grid(width, rows)
+        window = grid.window
+        state = SnakeState(rows, seed)
+        snake = Snake(grid, (0, 255, 0), state)
+    pilot = Autopilot(rows) if autopilot else None
+    recorder = Recorder(state) if record else None
+    step = recorder.step if recorder else state.step
+    phase = profiler.phase if profiler else contextlib.nullcontext
     pygame.init()
     myfont = pygame.font.SysFont(pygame.font.get_default_font(), 30)
+    if not camera:
+        scoreboard = Scoreboard(grid, myfont)
+    if profiler:
+        hudfont = pygame.font.SysFont(pygame.font.get_default_font(), 20)
     # You will want to use a clock to set the pace of the game, otherwise it will run as fast as your CPU can.
     clock = pygame.time.Clock()
+    redraw = True  # Draw everything on the first frame and after every game.
+    snack = None
+    score = scoretext = None
     while True:  # Game loop.
-        clock.tick(10)
+        clock.tick(fps)
+        if profiler:
+            profiler.frame()
         # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:  # Check for window close.
-                pygame.quit()
-            if event.type == pygame.KEYDOWN:  # Check for key presses.
-                if event.key == pygame.K_LEFT:
-                    snake.direction = (-1, 0)
-                    snake.trail[snake.head.pos[:]] = [snake.direction[0], snake.direction[1]]
-                elif event.key == pygame.K_RIGHT:
-                    snake.direction = (1, 0)
-                    snake.trail[snake.head.pos[:]] = [snake.direction[0], snake.direction[1]]
-                elif event.key == pygame.K_UP:
-                    snake.direction = (0, -1)
-                    snake.trail[snake.head.pos[:]] = [snake.direction[0], snake.direction[1]]
-                elif event.key == pygame.K_DOWN:
-                    snake.direction = (0, 1)
-                    snake.trail[snake.head.pos[:]] = [snake.direction[0], snake.direction[1]]
-        snake.move()
-        # Check collisions: Snack.
-        if snake.body[0].pos == snack.pos:
-            snake.add_segment()
-            snack = Cube(grid, random_cell(rows, snake), color=(255, 0, 0))
-        # Check collisions: Own body.
-        for x in range(len(snake.body)):
-            if snake.body[x].pos in list(map(lambda z: z.pos, snake.body[x + 1:])):
-                print('Score: ', len(snake.body))
-                grid.window.blits([(myfont.render('GAME OVER', False, (255, 255, 255)), (200, 230)),
+        with phase('events'):
+            action = None
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:  # Check for window close.
+                    if recorder:
+                        recorder.save(record)
+                    if profiler:
+                        profiler.close()
+                    pygame.quit()
+                if event.type == pygame.KEYDOWN and event.key in KEYS:  # Check for key presses.
+                    action = KEYS[event.key]
+        with phase('update'):
+            if pilot is not None:
+                action = pilot(state)
+            _, _, done = step(action)
+            # Check collisions: Own body.
+            if done:
+                print('Score: ', state.score)
+                window.blits([(myfont.render('YOU WIN' if state.won else 'GAME OVER', False, (255, 255, 255)), (200, 230)),
                                    (myfont.render('Press a key to continue ...', False, (255, 255, 255)), (150, 270))])
                 pygame.display.update()
-                pause()
-                snake.reset()
-                break
-        grid.draw()
-        snake.draw()
-        snack.draw()
-        scoretext = myfont.render('Score: {}'.format(len(snake.body) - 1), False, (255, 255, 255))
-        grid.window.blit(scoretext, (0, 0))
-        pygame.display.update()
+                if pilot is None:
+                    pause()
+                state.reset()
+                if recorder:
+                    recorder.save(record)
+                redraw = True
+        with phase('draw'):
+            rects = None  # Everything.
+            if camera:
+                view.draw(state)
+                if state.score != score:
+                    score = state.score
+                    scoretext = myfont.render('Score: {}'.format(score), False, (255, 255, 255))
+                window.blit(scoretext, (0, 0))
+            elif redraw:
+                grid.draw()
+                snake.draw()
+                snack = Cube(grid, state.snack, color=(255, 0, 0))
+                snack.draw()
+                scoreboard.score = None
+                scoreboard.draw(state, snake, snack)
+                redraw = False
+            else:
+                # Only draw what changed on this step.
+                rects = snake.draw_changes()
+                if snack.pos != state.snack:
+                    snack = Cube(grid, state.snack, color=(255, 0, 0))
+                    rects.append(snack.draw())
+                rects += scoreboard.draw(state, snake, snack, rects)
+        if profiler:
+            with phase('hud'):
+                hud = profiler.draw(window, hudfont)
+                if rects is not None:
+                    rects.append(hud)
+        with phase('flip'):
+            if rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(rects)
 
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    import os
+    import sys
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    import frameprof
+    parser = argparse.ArgumentParser(description="Eat the snacks without biting yourself.")
+    parser.add_argument('-r', '--rows', type=int, default=20, help="Number of rows of the grid.")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="Seed for the placement of the snacks.")
+    parser.add_argument('-a', '--autopilot', action='store_true', help="Let the computer play.")
+    parser.add_argument('--fps', type=int, default=10, help="Moves per second.")
+    parser.add_argument('-c', '--camera', action='store_true',
+                        help="Follow the head and show only the cells around it, for huge grids.")
+    parser.add_argument('--record', help="Record the session to this file.")
+    frameprof.add_arguments(parser)
+    args = parser.parse_args()
+    if args.rows < 1:
+        parser.error('The grid needs at least one row.')
+    if not args.camera and args.rows > WIDTH:
+        parser.error(f'At most {WIDTH} rows fit on the screen. Use -c to play on bigger grids.')
+    if args.record and args.seed is not None and args.seed not in SEEDS:
+        parser.error(f'Recorded games need a seed from 0 to {SEEDS.stop - 1}.')
+    if args.camera and args.rows < WIDTH // CELL:
+        parser.error(f'The camera needs at least {WIDTH // CELL} rows, the cells in view. Smaller grids fit without it.')
+    main(args.rows, args.seed, args.autopilot, args.fps, args.camera, args.record, frameprof.from_arguments(args))
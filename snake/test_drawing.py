@@ -0,0 +1,57 @@
+"""
+Checks that drawing only what changed leaves the same picture as drawing everything, with SDL's dummy video driver so
+that no window opens:
+
+    python -m pytest test_drawing.py
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+from autopilot import Autopilot
+from core import SnakeState
+from snake import Grid, Snake, Cube, Scoreboard
+
+
+def test_changes_same_as_full_redraw():
+    """ Frame after frame, the autopilot's game drawn with draw_changes looks pixel for pixel like a full redraw. """
+    pygame.init()
+    rows = 20
+    grid = Grid(500, rows)
+    state = SnakeState(rows, seed=0)
+    snake = Snake(grid, (0, 255, 0), state)
+    scoreboard = Scoreboard(grid, pygame.font.SysFont(pygame.font.get_default_font(), 30))
+    pilot = Autopilot(rows)
+
+    def full():
+        """ Same as the first frame of the game. """
+        grid.draw()
+        snake.draw()
+        snack = Cube(grid, state.snack, color=(255, 0, 0))
+        snack.draw()
+        scoreboard.score = None
+        scoreboard.draw(state, snake, snack)
+        return snack
+
+    snack = full()
+    games = 0
+    for _ in range(1000):
+        _, _, done = state.step(pilot(state))
+        if done:
+            state.reset()
+            snack = full()
+            games += 1
+            continue
+        rects = snake.draw_changes()
+        if snack.pos != state.snack:
+            snack = Cube(grid, state.snack, color=(255, 0, 0))
+            rects.append(snack.draw())
+        scoreboard.draw(state, snake, snack, rects)
+        drawn = pygame.surfarray.array3d(grid.window)
+        snack = full()
+        assert (pygame.surfarray.array3d(grid.window) == drawn).all()
+    assert state.score > 20 or games  # The snake grew long, or the test covers nothing.
+    pygame.quit()
@@ -0,0 +1,45 @@
+"""
+Checks that the vectorized games follow the same rules as core.SnakeState:
+
+    python -m pytest test_vector_env.py
+"""
+import numpy
+
+from core import SnakeState, LEFT, RIGHT, UP, DOWN
+from vector_env import VectorSnake, KEEP
+
+DIRECTIONS = [LEFT, RIGHT, UP, DOWN]  # Same order as vector_env.DX and DY.
+
+
+def body(env, i):
+    """ Cells of a game's snake, head first, as (x, y). """
+    slots = (env.head[i] - numpy.arange(env.length[i])) % env.cells
+    return [(int(cell % env.rows), int(cell // env.rows)) for cell in env.positions[i, slots]]
+
+
+def test_same_as_snake_state():
+    """
+    Games stepped together get the same rewards, end at the same time and have the same snakes as SnakeState stepping
+    them one by one. The snacks are placed by different random generators, so SnakeState gets the batch's snacks.
+    """
+    envs = 200
+    rows = 6  # Small, so that the snakes bite themselves often and grow long.
+    env = VectorSnake(envs, rows, seed=0)
+    states = [SnakeState(rows, seed=i) for i in range(envs)]
+    rng = numpy.random.default_rng(0)
+    rewards = []
+    for _ in range(2000):
+        for i, state in enumerate(states):
+            state.snack = (int(env.snack[i] % rows), int(env.snack[i] // rows))
+        actions = rng.integers(-4, 4, envs)  # Keep going half of the time.
+        actions[actions < 0] = KEEP
+        reward, done = env.step(actions)
+        for i, state in enumerate(states):
+            _, expected, over = state.step(None if actions[i] == KEEP else DIRECTIONS[actions[i]])
+            assert (expected, over) == (reward[i], done[i])
+            if over:
+                state.reset()
+            assert list(state.body) == body(env, i)
+        rewards.append(reward)
+    rewards = numpy.array(rewards)
+    assert (rewards == 1).sum() > envs and (rewards == -1).sum() > envs
@@ -0,0 +1,137 @@
+"""
+Thousands of snake games stepped at once with numpy.
+
+Follows the rules of core.SnakeState (edges wrap around, the tail leaves its cell as the head moves, eating a snack
+grows the snake by one), with every game's state kept in arrays indexed by environment:
+
+- positions: ring buffer with the cells of the body (cell = y * rows + x). The head slot moves forward on every step,
+  and the tail is always length - 1 slots behind it, so moving never shifts any data.
+- occupied: boolean occupancy grid of every game.
+
+Finished games start over automatically on the next step, so the batch never stalls.
+"""
+import numpy
+
+# Same order as the directions in core: LEFT, RIGHT, UP, DOWN.
+DX = numpy.array([-1, 1, 0, 0])
+DY = numpy.array([0, 0, -1, 1])
+KEEP = -1
+
+
+class VectorSnake:
+    """ A batch of snake games on grids of the same size. """
+    def __init__(self, envs, rows=20, seed=None):
+        """
+        :param envs: Number of games.
+        :param rows: Number of rows (and columns) of every grid.
+        :param seed: Seed of the random generator that places the snacks.
+        """
+        self.envs = envs
+        self.rows = rows
+        self.cells = rows * rows
+        self.start = (rows // 2) * rows + rows // 2
+        self.random = numpy.random.default_rng(seed)
+        self.index = numpy.arange(envs)
+        self.positions = numpy.zeros((envs, self.cells), dtype=numpy.int32)
+        self.occupied = numpy.zeros((envs, self.cells), dtype=bool)
+        self.head = numpy.zeros(envs, dtype=numpy.int64)  # Slot of the head in the ring buffer.
+        self.length = numpy.zeros(envs, dtype=numpy.int64)
+        self.direction = numpy.zeros(envs, dtype=numpy.int64)
+        self.snack = numpy.zeros(envs, dtype=numpy.int64)
+        self.reset()
+
+    @property
+    def score(self):
+        return self.length - 1
+
+    def reset(self, envs=None):
+        """
+        Starts games over with a single-segment snake going down.
+        :param envs: Integer array with the games to reset. All of them by default.
+        """
+        if envs is None:
+            envs = self.index
+        self.occupied[envs] = False
+        self.occupied[envs, self.start] = True
+        self.head[envs] = 0
+        self.positions[envs, 0] = self.start
+        self.length[envs] = 1
+        self.direction[envs] = 3
+        self.place_snacks(envs)
+
+    def place_snacks(self, envs):
+        """
+        Puts a snack on a random free cell of each of the given games.
+        A few rounds of random guesses place almost all of them; the games left (crowded grids) pick among their free
+        cells directly.
+        :param envs: Integer array with the games that need a snack. Their grids must have a free cell.
+        """
+        for _ in range(4):
+            if len(envs) == 0:
+                return
+            guesses = self.random.integers(0, self.cells, len(envs))
+            free = ~self.occupied[envs, guesses]
+            self.snack[envs[free]] = guesses[free]
+            envs = envs[~free]
+        if len(envs):
+            weights = self.random.random((len(envs), self.cells)) * ~self.occupied[envs]
+            self.snack[envs] = numpy.argmax(weights, axis=1)
+
+    def step(self, actions=None):
+        """
+        Moves every snake one cell.
+        :param actions: Integer array with one direction per game (index into DX and DY), or KEEP (-1) to keep going.
+                        None keeps going on every game.
+        :returns: Tuple of arrays with the rewards (1 for eating a snack, -1 for biting itself, 0 otherwise) and whether
+                  each game finished. Finished games are already reset.
+        """
+        if actions is not None:
+            self.direction = numpy.where(actions == KEEP, self.direction, actions)
+        head = self.positions[self.index, self.head]
+        x = (head % self.rows + DX[self.direction]) % self.rows
+        y = (head // self.rows + DY[self.direction]) % self.rows
+        new = y * self.rows + x
+        ate = new == self.snack
+        # The tail leaves its cell at the same time the head moves, so the head can take it.
+        moving = ~ate
+        tail = self.positions[self.index, (self.head - self.length + 1) % self.cells]
+        self.occupied[self.index[moving], tail[moving]] = False
+        self.length += ate
+        bitten = self.occupied[self.index, new]
+        self.head = (self.head + 1) % self.cells
+        self.positions[self.index, self.head] = new
+        self.occupied[self.index, new] = True
+
+        full = self.length == self.cells
+        done = bitten | full
+        rewards = numpy.where(bitten, -1, ate.astype(numpy.int64))
+        self.place_snacks(self.index[ate & ~done])
+        if done.any():
+            self.reset(self.index[done])
+        return rewards, done
+
+
+def benchmark(envs=4096, rows=20, steps=1000, seed=0):
+    """
+    Steps random games and prints the environment steps per second.
+    """
+    import time
+    env = VectorSnake(envs, rows, seed)
+    rng = numpy.random.default_rng(seed)
+    actions = rng.integers(-4, 4, (steps, envs))  # Keep going half of the time.
+    actions[actions < 0] = KEEP
+    start = time.perf_counter()
+    for i in range(steps):
+        env.step(actions[i])
+    elapsed = time.perf_counter() - start
+    print(f'{envs} games: {envs * steps / elapsed:.0f} steps/s')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Measures the steps per second of the vectorized snake games.")
+    parser.add_argument('-n', '--envs', type=int, default=4096, help="Number of games.")
+    parser.add_argument('-r', '--rows', type=int, default=20, help="Number of rows of the grids.")
+    parser.add_argument('-s', '--steps', type=int, default=1000, help="Number of steps.")
+    args = parser.parse_args()
+    benchmark(args.envs, args.rows, args.steps)